@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark POST /api/login throughput under concurrent clients.
+
+Each configuration runs in its own process against a fresh SQLite database:
+hashing inline on the request thread (PASSWORD_HASH_WORKERS=0) versus the
+bounded thread and process pools. Clients log in as one of a few seeded
+users for a fixed duration; rejected logins (503) are counted separately
+and the client waits out their Retry-After.
+With --rehash the users are seeded under the 'pbkdf2' profile, so the first
+login of each also upgrades the hash.
+
+Usage: python benchmarks/bench_login.py [seconds] [clients] [--rehash]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+USERS = 8
+PASSWORD = 'correct horse battery staple'
+
+CONFIGURATIONS = {
+    'inline': {'PASSWORD_HASH_WORKERS': '0'},
+    'thread pool': {'PASSWORD_HASH_EXECUTOR': 'thread'},
+    'process pool': {'PASSWORD_HASH_EXECUTOR': 'process'},
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_configuration(seconds, clients, rehash):
+    """Runs inside the child process: the app is imported with the configuration's environment"""
+    # The app keeps its SQLite file under ./instance
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs('instance')
+    sys.path.append(ROOT)
+
+    from src.main import app
+    from src.models.user import User, db
+    from src.services.passwords import PASSWORD_HASH_PROFILES, PasswordHasher, hasher
+
+    seed_hasher = PasswordHasher(PASSWORD_HASH_PROFILES['pbkdf2'], workers=0) if rehash else hasher
+    with app.app_context():
+        for number in range(USERS):
+            user = User(username=f'bench{number}', email=f'bench{number}@example.com')
+            user.password_hash = seed_hasher.hash(PASSWORD)
+            db.session.add(user)
+        db.session.commit()
+
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client(number):
+        http = app.test_client()
+        mine, seen = [], {}
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = http.post('/api/login', json={'username': f'bench{number % USERS}', 'password': PASSWORD})
+            elapsed = time.perf_counter() - start
+            seen[response.status_code] = seen.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                mine.append(elapsed)
+            elif response.status_code == 503:
+                # Back off as told, like a well-behaved client
+                time.sleep(float(response.headers.get('Retry-After', 1)))
+        with lock:
+            latencies.extend(mine)
+            for status, count in seen.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client, args=(number,)) for number in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(json.dumps({
+        'logins_per_second': len(latencies) / seconds,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'statuses': statuses,
+        'hasher': hasher.stats(),
+    }))
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    seconds = float(args[0]) if len(args) > 0 else 5
+    clients = int(args[1]) if len(args) > 1 else 16
+    rehash = '--rehash' in sys.argv
+
+    if os.environ.get('BENCH_LOGIN_CHILD'):
+        run_configuration(seconds, clients, rehash)
+        return
+
+    print(f'{clients} clients, {seconds:g}s per configuration, {os.cpu_count()} CPUs')
+    print(f"{'configuration':<14} {'logins/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'503s':>6}")
+    for name, environ in CONFIGURATIONS.items():
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__)] + sys.argv[1:],
+            env=dict(os.environ, BENCH_LOGIN_CHILD='1', AUTO_MIGRATE='1', RATE_LIMIT_BACKEND='off', **environ),
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{name:<14} {result['logins_per_second']:>9.1f} {result['p50_ms']:>8.1f} "
+              f"{result['p99_ms']:>8.1f} {result['statuses'].get('503', 0):>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Benchmark the pooled OAuth provider client against a local stub provider.
+
+The stub serves a token endpoint, a userinfo endpoint and a JWKS with a
+configurable delay, counts the TCP connections it accepts, and can be told
+to hang or to fail. Its token responses carry an ID token signed with a key
+generated at startup. Four runs:
+
+  sign-ins      token exchange + profile fetch, unpooled requests.* calls
+                (as the callbacks used to make) versus the shared client
+  id tokens     token exchange + local ID token check against the cached JWKS
+  timeout       a provider that never answers, bounded by the read timeout
+  outage        a provider answering 503: retries, then the breaker fails fast
+
+Usage: python benchmarks/bench_oauth_client.py [sign_ins] [delay_ms]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from authlib.jose import JsonWebKey, JsonWebToken
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.http_client import ProviderClient, ProviderUnavailable
+from src.services.id_tokens import JwksCache, verify_id_token
+
+STUB_ISSUER = 'https://accounts.google.com'
+STUB_AUDIENCE = 'stub-client-id'
+
+
+class StubProvider(ThreadingHTTPServer):
+    """Local stand-in for an OAuth provider"""
+
+    daemon_threads = True
+
+    def __init__(self, delay=0.0, audience=STUB_AUDIENCE):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.delay = delay
+        self.audience = audience
+        self.mode = 'ok'
+        self.connections = 0
+        self.signing_key = JsonWebKey.generate_key('RSA', 2048, is_private=True, options={'kid': 'stub-1'})
+        self._lock = threading.Lock()
+
+    def id_token(self):
+        now = int(time.time())
+        claims = {
+            'iss': STUB_ISSUER, 'aud': self.audience, 'sub': '42', 'iat': now, 'exp': now + 3600,
+            'email': 'stub@example.com', 'email_verified': True, 'given_name': 'Stub',
+        }
+        header = {'alg': 'RS256', 'kid': self.signing_key.kid}
+        return JsonWebToken(['RS256']).encode(header, claims, self.signing_key).decode()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}'
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so a pooled client can reuse the connection
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        if self.server.mode == 'hang':
+            time.sleep(60)
+            return
+        time.sleep(self.server.delay)
+        if self.server.mode == 'fail':
+            status, body = 503, {'error': 'unavailable'}
+        elif self.path.startswith('/token'):
+            status, body = 200, {'access_token': 'stub-token', 'token_type': 'Bearer', 'id_token': self.server.id_token()}
+        elif self.path.startswith('/certs'):
+            status, body = 200, {'keys': [self.server.signing_key.as_dict(is_private=False)]}
+        else:
+            status, body = 200, {'id': '42', 'email': 'stub@example.com', 'given_name': 'Stub'}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Cache-Control', 'public, max-age=3600')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = _respond
+
+
+def sign_ins(provider, count, post, get):
+    start = time.perf_counter()
+    for _ in range(count):
+        token = post(f'{provider.url}/token', data={'code': 'abc'}).json()
+        get(f'{provider.url}/userinfo', headers={'Authorization': f"Bearer {token['access_token']}"}).json()
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    delay = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+
+    print(f'{count} sign-ins, {delay * 1000:g} ms provider delay')
+    with StubProvider(delay) as provider:
+        unpooled = sign_ins(provider, count, requests.post, requests.get)
+        print(f'  unpooled requests.*   {unpooled * 1000:6.2f} ms/sign-in  {provider.connections} connections')
+
+        provider.connections = 0
+        client = ProviderClient()
+        pooled = sign_ins(
+            provider, count,
+            lambda url, **kw: client.post('stub', url, **kw),
+            lambda url, **kw: client.get('stub', url, **kw),
+        )
+        print(f'  pooled ProviderClient {pooled * 1000:6.2f} ms/sign-in  {provider.connections} connections')
+        print(f"  latency {client.stats()['stub']['latency_ms']}")
+
+        provider.connections = 0
+        client = ProviderClient()
+        jwks = JwksCache('stub', f'{provider.url}/certs', client=client)
+        start = time.perf_counter()
+        for _ in range(count):
+            token = client.post('stub', f'{provider.url}/token', data={'code': 'abc'}).json()
+            verify_id_token(token['id_token'], jwks, STUB_AUDIENCE, (STUB_ISSUER,))
+        id_tokens = (time.perf_counter() - start) / count
+        print(f'id tokens: pooled + local check {id_tokens * 1000:6.2f} ms/sign-in  '
+              f"{client.stats()['stub']['calls']} provider calls ({jwks.refreshes} JWKS fetch)")
+
+        provider.mode = 'hang'
+        client = ProviderClient(read_timeout=0.5, retries=0)
+        start = time.perf_counter()
+        try:
+            client.get('stub', f'{provider.url}/userinfo')
+        except requests.Timeout:
+            pass
+        print(f'timeout: hanging provider gave up after {time.perf_counter() - start:.2f} s')
+
+        provider.mode = 'fail'
+        client = ProviderClient(retries=2, backoff=0.05, failure_threshold=5, reset_timeout=30)
+        outcomes = []
+        for _ in range(5):
+            start = time.perf_counter()
+            try:
+                outcome = client.get('stub', f'{provider.url}/userinfo').status_code
+            except ProviderUnavailable:
+                outcome = 'breaker open'
+            outcomes.append(f'{outcome} in {(time.perf_counter() - start) * 1000:.0f} ms')
+        print('outage: ' + ', '.join(outcomes))
+        print(f"  {client.stats()['stub']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark the /calculate projection series: legacy per-year loop vs the vectorized engine.
+
+Usage: python benchmarks/bench_projections.py [requests_per_horizon]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.projection import project, projection_rows
+
+
+def legacy_projections(age, income, work_tenure_years, assets, income_growth_rate, asset_growth_rate, horizon):
+    """The original loop from calculate_financial_projections, without the 26 row cap"""
+    remaining_years = max(0, min(work_tenure_years, 65 - age))
+    projections = []
+    for year in range(0, max(remaining_years, horizon) + 1):
+        projected_income = income * ((1 + income_growth_rate) ** year) if year < remaining_years else 0
+        projected_assets = assets * ((1 + asset_growth_rate) ** year)
+        projections.append({
+            'year': 2025 + year,
+            'age': age + year,
+            'income': round(projected_income),
+            'assets': round(projected_assets),
+            'human_capital': round(projected_income * max(0, remaining_years - year)) if year < remaining_years else 0
+        })
+    return projections
+
+
+def cpu_time_per_request(fn, requests):
+    start = time.process_time()
+    for _ in range(requests):
+        fn()
+    return (time.process_time() - start) / requests
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    age, income, tenure, assets = 30, 1_200_000, 35, 2_500_000
+
+    print(f"{'horizon':>8} {'legacy us':>10} {'engine us':>10} {'speedup':>8}")
+    for horizon in (25, 55, 100, 149):
+        lifespan = age + horizon
+        legacy = cpu_time_per_request(
+            lambda: legacy_projections(age, income, tenure, assets, 0.06, 0.08, horizon), requests)
+        engine = cpu_time_per_request(
+            lambda: projection_rows(project(age, income, tenure, assets, 0.06, 0.08, lifespan)), requests)
+        print(f"{horizon:>8} {legacy * 1e6:>10.1f} {engine * 1e6:>10.1f} {legacy / engine:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent SQLite reads and writes under each pragma profile.
+
+Readers run the dashboard-style "load a profile's goals" query while writers
+insert goals, each on its own pooled connection, for a fixed duration.
+
+Usage: python benchmarks/bench_sqlite_concurrency.py [seconds] [readers] [writers]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from src.services.database import SQLITE_PRAGMA_PROFILES, install_sqlite_pragmas
+
+PROFILES = 50
+SEED_ROWS = 20000
+
+
+def setup(engine):
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE financial_goal (id INTEGER PRIMARY KEY, profile_id INTEGER NOT NULL, '
+            'description VARCHAR(255), amount FLOAT, order_index INTEGER)'
+        ))
+        connection.execute(text('CREATE INDEX ix_goal_profile ON financial_goal (profile_id, order_index)'))
+        connection.execute(
+            text('INSERT INTO financial_goal (profile_id, description, amount, order_index) VALUES (:p, :d, :a, :o)'),
+            [{'p': i % PROFILES, 'd': f'goal {i}', 'a': i * 10.0, 'o': i} for i in range(SEED_ROWS)]
+        )
+
+
+def worker(engine, kind, deadline, counts, errors):
+    rng = random.Random()
+    done = failed = 0
+    with engine.connect() as connection:
+        while time.perf_counter() < deadline:
+            try:
+                if kind == 'read':
+                    connection.execute(
+                        text('SELECT * FROM financial_goal WHERE profile_id = :p ORDER BY order_index'),
+                        {'p': rng.randrange(PROFILES)}
+                    ).all()
+                else:
+                    connection.execute(
+                        text('INSERT INTO financial_goal (profile_id, description, amount, order_index) '
+                             'VALUES (:p, :d, :a, :o)'),
+                        {'p': rng.randrange(PROFILES), 'd': 'bench', 'a': 1.0, 'o': rng.randrange(10 ** 6)}
+                    )
+                connection.commit()
+                done += 1
+            except OperationalError:
+                # "database is locked": the writer/reader gave up waiting
+                connection.rollback()
+                failed += 1
+    counts[kind] += done
+    errors[kind] += failed
+
+
+def run(profile, seconds, readers, writers):
+    directory = tempfile.mkdtemp()
+    engine = create_engine(
+        f'sqlite:///{os.path.join(directory, "bench.db")}',
+        pool_size=readers + writers,
+        connect_args={'timeout': 0.1, 'check_same_thread': False},
+    )
+    install_sqlite_pragmas(engine, SQLITE_PRAGMA_PROFILES[profile])
+    setup(engine)
+
+    counts, errors = {'read': 0, 'write': 0}, {'read': 0, 'write': 0}
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=worker, args=(engine, kind, deadline, counts, errors))
+        for kind in ['read'] * readers + ['write'] * writers
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return {kind: counts[kind] / seconds for kind in counts}, errors
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    writers = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+    print(f"{seconds:g}s, {readers} readers, {writers} writers")
+    print(f"{'profile':>8} {'reads/s':>10} {'writes/s':>10} {'read errs':>10} {'write errs':>10}")
+    for profile in SQLITE_PRAGMA_PROFILES:
+        rates, errors = run(profile, seconds, readers, writers)
+        print(f"{profile:>8} {rates['read']:>10.0f} {rates['write']:>10.0f} {errors['read']:>10} {errors['write']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,18 @@ from src.routes.user import user_bp
 from src.routes.financial import financial_bp
 from src.routes.oauth import oauth_bp
 from src.models.financial import FinancialProfile, FinancialGoal, FinancialExpense
+from src.services.aggregates import verify_profile_aggregates
+from src.services.database import (
+    database_uri, engine_options, install_sqlite_pragmas, pool_stats, read_database_uri, sqlite_pragmas,
+)
+from src.services.http_client import provider_client
+from src.services.migrations import startup_check, status, upgrade
+from src.services.ordering import rebalance_crowded
+from src.services.query_plans import check_query_plans
+from src.services.rate_limit import init_rate_limiting, rate_limiter_from_env
+from src.services.routing import READ_BIND, init_read_routing
+from src.services.snapshots import SNAPSHOT_DAILY_DAYS, SNAPSHOT_RAW_DAYS, compact_snapshots
+import click
 import pymysql
 
 app = Flask(__name__)
@@ -22,8 +34,16 @@ else:
     # Local development
     db_path = os.path.abspath(os.path.join(os.getcwd(), 'instance', 'life_sheet.db'))
 
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+# DATABASE_URL (MySQL / PostgreSQL) takes precedence over the SQLite file
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(os.environ, db_path)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], os.environ)
+# GET routes read from a replica (DATABASE_READ_URL) or a read-only SQLite pool
+read_uri = read_database_uri(app.config['SQLALCHEMY_DATABASE_URI'], os.environ)
+if read_uri:
+    app.config['SQLALCHEMY_BINDS'] = {READ_BIND: read_uri}
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# SQLite pragma profile applied on every new connection ('tuned' or 'default')
+app.config['SQLITE_PRAGMA_PROFILE'] = os.environ.get('SQLITE_PRAGMA_PROFILE', 'tuned')
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev_key_123')
 
 # Enable CORS for all routes
@@ -34,7 +54,9 @@ CORS(app,
          'https://life-sheet-app.onrender.com'
      ],
      allow_headers=["Content-Type", "Authorization", "Access-Control-Allow-Credentials"],
-     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"]
+     methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+     # Let browsers reuse preflight results instead of re-sending OPTIONS before every call
+     max_age=int(os.environ.get('CORS_MAX_AGE', 86400))
 )
 
 # Session cookie settings for development
@@ -44,60 +66,100 @@ app.config['SESSION_COOKIE_SECURE'] = False
 # Initialize SQLAlchemy
 db.init_app(app)
 
+with app.app_context():
+    install_sqlite_pragmas(db.engine, sqlite_pragmas(app.config))
+    if READ_BIND in db.engines:
+        install_sqlite_pragmas(db.engines[READ_BIND], dict(sqlite_pragmas(app.config), query_only='ON'))
+
+# Turn away over-limit sign-in and calculation requests before they reach the database
+init_rate_limiting(app, rate_limiter_from_env())
+
+# Keep clients on the primary for a few seconds after they write
+init_read_routing(app, window=float(os.environ.get('READ_YOUR_WRITES_SECONDS', 5)))
+
 # Register blueprints
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(financial_bp, url_prefix='/api/financial')
 app.register_blueprint(oauth_bp, url_prefix='/api/oauth')
 
-# Create database tables if they don't exist
+# Bring the schema up to date: a single version read when nothing is pending.
+# Multi-worker deployments should set AUTO_MIGRATE=0 and run `flask migrate` on release.
 with app.app_context():
-    db.create_all()
-    
-    # Check if columns exist and add them if they don't
-    engine = db.engine
-    inspector = db.inspect(engine)
-    
-    try:
-        # Check financial_profile table
-        columns = inspector.get_columns('financial_profile')
-        column_names = [column['name'] for column in columns]
-        
-        # List of columns to check and add if missing
-        missing_columns = {
-            'loan_tenure_years': 'INTEGER',
-            'lifespan_years': 'INTEGER',
-            'income_growth_rate': 'FLOAT',
-            'asset_growth_rate': 'FLOAT'
-        }
-        
-        for column_name, column_type in missing_columns.items():
-            if column_name not in column_names:
-                print(f"Adding missing column: {column_name}")
-                if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
-                    db.session.execute(f"ALTER TABLE financial_profile ADD COLUMN {column_name} {column_type}")
-                else:
-                    db.session.execute(f"ALTER TABLE financial_profile ADD COLUMN {column_name} {column_type} NULL")
-        
-        # Check financial_loan table
-        columns = inspector.get_columns('financial_loan')
-        column_names = [column['name'] for column in columns]
-        
-        if 'emi' not in column_names:
-            print("Adding missing column: emi to financial_loan table")
-            if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
-                db.session.execute("ALTER TABLE financial_loan ADD COLUMN emi FLOAT")
-            else:
-                db.session.execute("ALTER TABLE financial_loan ADD COLUMN emi FLOAT NULL")
-        
-        db.session.commit()
-        print("Database schema updated successfully")
-    except Exception as e:
-        print(f"Database schema update error: {e}")
+    startup_check(db.engine, auto_migrate=os.environ.get('AUTO_MIGRATE', '1') == '1')
+
+@app.cli.command('migrate')
+@click.option('--status', 'show_status', is_flag=True, help='List migrations and whether they are applied.')
+@click.option('--target', type=int, default=None, help='Stop after this version.')
+def migrate(show_status, target):
+    """Apply pending schema migrations"""
+    if show_status:
+        for version, name, applied in status(db.engine):
+            print(f"{'applied' if applied else 'pending'}  {version:04d}_{name}")
+        return
+    applied = upgrade(db.engine, target=target)
+    print(f"{len(applied)} migrations applied")
+
+@app.cli.command('rebuild-aggregates')
+@click.option('--check', is_flag=True, help='Only report drift, do not rewrite the aggregates.')
+def rebuild_aggregates(check):
+    """Verify the materialized profile aggregates against the child rows and repair drift"""
+    drift = verify_profile_aggregates(fix=not check)
+    for record in drift:
+        print(f"Profile {record['profile_id']} {record['column']}: stored {record['stored']}, expected {record['expected']}")
+    if check:
+        print(f"{len(drift)} aggregate mismatches found")
+        if drift:
+            sys.exit(1)
+    else:
+        print(f"{len(drift)} aggregate mismatches repaired")
+
+@app.cli.command('rebalance-order')
+@click.option('--min-gap', default=2, show_default=True, help='Renumber lists with a gap smaller than this.')
+def rebalance_order(min_gap):
+    """Renumber goal/expense/loan lists whose order_index gaps have run out"""
+    print(f"{rebalance_crowded(min_gap)} lists renumbered")
+
+@app.cli.command('compact-snapshots')
+@click.option('--raw-days', default=SNAPSHOT_RAW_DAYS, show_default=True, help='Keep every snapshot this recent.')
+@click.option('--daily-days', default=SNAPSHOT_DAILY_DAYS, show_default=True, help='Keep one snapshot per day this recent; older history keeps one per month.')
+def compact_snapshots_command(raw_days, daily_days):
+    """Thin out old net-worth history to daily and then monthly snapshots"""
+    print(f"{compact_snapshots(raw_days, daily_days)} snapshots removed")
+
+@app.cli.command('check-query-plans')
+@click.option('--verbose', is_flag=True, help='Print every plan, not only the regressions.')
+def check_query_plans_command(verbose):
+    """Fail if any hot query plan falls back to a full scan or an unindexed sort"""
+    with db.engine.connect() as connection:
+        results = check_query_plans(connection)
+    failures = 0
+    for label, plan, problems in results:
+        if problems:
+            failures += 1
+            print(f"FAIL  {label}: {'; '.join(problems)}")
+        elif verbose:
+            print(f"ok    {label}: {'; '.join(plan)}")
+    print(f"{len(results) - failures}/{len(results)} query plans use indexes")
+    if failures:
+        sys.exit(1)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy'})
 
+@app.route('/api/health/db', methods=['GET'])
+def database_health():
+    """Connection pool statistics"""
+    stats = pool_stats(db.engine)
+    if READ_BIND in db.engines:
+        stats['read'] = pool_stats(db.engines[READ_BIND])
+    return jsonify(stats)
+
+@app.route('/api/health/oauth', methods=['GET'])
+def oauth_health():
+    """OAuth provider call latency, failures and circuit breaker state"""
+    return jsonify(provider_client.stats())
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=10000)
 
@@ -0,0 +1,111 @@
+"""
+Create the base tables.
+
+A frozen snapshot of the schema as it stood before versioned migrations,
+not the live models, so that replaying the history from here produces the
+same schema as upgrading an old database: later columns, indexes and
+constraints come from their own migrations. Existing databases keep what
+they have and only gain tables that are missing.
+"""
+
+from src.models.user import db
+
+metadata = db.MetaData()
+
+db.Table(
+    'user', metadata,
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('username', db.String(80), unique=True, nullable=False),
+    db.Column('email', db.String(120), unique=True, nullable=False),
+    db.Column('password_hash', db.String(255), nullable=False),
+    db.Column('first_name', db.String(50), nullable=True),
+    db.Column('last_name', db.String(50), nullable=True),
+    db.Column('is_active', db.Boolean),
+    db.Column('created_at', db.DateTime),
+    db.Column('last_login', db.DateTime, nullable=True),
+    db.Column('oauth_provider', db.String(50), nullable=True),
+    db.Column('oauth_id', db.String(255), nullable=True),
+)
+
+db.Table(
+    'financial_profile', metadata,
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), nullable=False),
+    db.Column('age', db.Integer, nullable=False),
+    db.Column('current_annual_gross_income', db.Float, nullable=True),
+    db.Column('work_tenure_years', db.Integer, nullable=True),
+    db.Column('total_asset_gross_market_value', db.Float),
+    db.Column('total_loan_outstanding_value', db.Float),
+    db.Column('monthly_income', db.Float, nullable=True),
+    db.Column('annual_income', db.Float, nullable=True),
+    db.Column('asset_value', db.Float),
+    db.Column('loan_value', db.Float),
+    db.Column('created_at', db.DateTime),
+    db.Column('updated_at', db.DateTime),
+)
+
+db.Table(
+    'financial_goal', metadata,
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), nullable=False),
+    db.Column('profile_id', db.Integer, db.ForeignKey('financial_profile.id'), nullable=False),
+    db.Column('description', db.String(255), nullable=False),
+    db.Column('amount', db.Float, nullable=False),
+    db.Column('order_index', db.Integer, nullable=False),
+    db.Column('target_date', db.Date, nullable=True),
+    db.Column('priority', db.String(20)),
+    db.Column('status', db.String(20)),
+    db.Column('created_at', db.DateTime),
+    db.Column('updated_at', db.DateTime),
+)
+
+db.Table(
+    'financial_expense', metadata,
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), nullable=False),
+    db.Column('profile_id', db.Integer, db.ForeignKey('financial_profile.id'), nullable=False),
+    db.Column('description', db.String(255), nullable=False),
+    db.Column('amount', db.Float, nullable=False),
+    db.Column('order_index', db.Integer, nullable=False),
+    db.Column('expense_type', db.String(50)),
+    db.Column('frequency', db.String(20)),
+    db.Column('is_essential', db.Boolean),
+    db.Column('created_at', db.DateTime),
+    db.Column('updated_at', db.DateTime),
+)
+
+db.Table(
+    'financial_scenario', metadata,
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), nullable=False),
+    db.Column('profile_id', db.Integer, db.ForeignKey('financial_profile.id'), nullable=False),
+    db.Column('scenario_name', db.String(100), nullable=False),
+    db.Column('description', db.Text, nullable=True),
+    db.Column('surplus', db.Float),
+    db.Column('total_assets', db.Float),
+    db.Column('total_liabilities', db.Float),
+    db.Column('human_capital', db.Float),
+    db.Column('future_expenses', db.Float),
+    db.Column('net_worth', db.Float),
+    db.Column('asset_growth_rate', db.Float),
+    db.Column('income_growth_rate', db.Float),
+    db.Column('expense_growth_rate', db.Float),
+    db.Column('created_at', db.DateTime),
+    db.Column('updated_at', db.DateTime),
+)
+
+db.Table(
+    'financial_loan', metadata,
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), nullable=False),
+    db.Column('profile_id', db.Integer, db.ForeignKey('financial_profile.id'), nullable=False),
+    db.Column('name', db.String(255), nullable=False),
+    db.Column('amount', db.Float, nullable=False),
+    db.Column('order_index', db.Integer, nullable=False),
+    db.Column('created_at', db.DateTime),
+    db.Column('updated_at', db.DateTime),
+)
+
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
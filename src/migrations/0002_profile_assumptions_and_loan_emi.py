@@ -0,0 +1,15 @@
+"""
+Loan tenure and calculation assumptions on financial_profile, EMI on financial_loan.
+
+Previously added by the start-up inspector and the add_loan_tenure script.
+"""
+
+from src.services.migrations import add_column_if_missing
+
+
+def upgrade(connection):
+    add_column_if_missing(connection, 'financial_profile', 'loan_tenure_years', 'INTEGER NULL')
+    add_column_if_missing(connection, 'financial_profile', 'lifespan_years', 'INTEGER NULL')
+    add_column_if_missing(connection, 'financial_profile', 'income_growth_rate', 'FLOAT NULL')
+    add_column_if_missing(connection, 'financial_profile', 'asset_growth_rate', 'FLOAT NULL')
+    add_column_if_missing(connection, 'financial_loan', 'emi', 'FLOAT NULL')
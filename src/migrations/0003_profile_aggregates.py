@@ -0,0 +1,24 @@
+"""
+Materialized goal/expense/loan totals on financial_profile, back-filled from the child rows.
+"""
+
+from src.models.user import db
+from src.services.migrations import add_column_if_missing
+
+AGGREGATES = (
+    ('goals_total', 'financial_goal', 'amount'),
+    ('expenses_total', 'financial_expense', 'amount'),
+    ('loans_total', 'financial_loan', 'amount'),
+    ('emi_total', 'financial_loan', 'emi'),
+)
+
+
+def upgrade(connection):
+    for column, _, _ in AGGREGATES:
+        add_column_if_missing(connection, 'financial_profile', column, 'FLOAT DEFAULT 0')
+
+    for column, table, amount in AGGREGATES:
+        connection.execute(db.text(
+            f'UPDATE financial_profile SET {column} = '
+            f'(SELECT COALESCE(SUM({amount}), 0) FROM {table} WHERE {table}.profile_id = financial_profile.id)'
+        ))
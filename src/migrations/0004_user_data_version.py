@@ -0,0 +1,10 @@
+"""
+Per-user data version and timestamp backing the conditional GET validators.
+"""
+
+from src.services.migrations import add_column_if_missing
+
+
+def upgrade(connection):
+    add_column_if_missing(connection, 'user', 'data_version', 'INTEGER DEFAULT 0')
+    add_column_if_missing(connection, 'user', 'data_updated_at', 'DATETIME NULL')
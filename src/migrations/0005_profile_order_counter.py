@@ -0,0 +1,9 @@
+"""
+Per-profile order_index counter for atomic, sparse allocation.
+"""
+
+from src.services.migrations import add_column_if_missing
+
+
+def upgrade(connection):
+    add_column_if_missing(connection, 'financial_profile', 'order_counter', 'INTEGER DEFAULT 0')
@@ -0,0 +1,25 @@
+"""
+Indexes on the user_id / profile_id foreign keys, matching the list and profile access paths.
+"""
+
+from src.models.user import db
+
+INDEXES = (
+    ('ix_financial_profile_user_id', 'financial_profile', ('user_id',)),
+    ('ix_financial_goal_user_order', 'financial_goal', ('user_id', 'order_index', 'id')),
+    ('ix_financial_goal_profile_order', 'financial_goal', ('profile_id', 'order_index')),
+    ('ix_financial_expense_user_order', 'financial_expense', ('user_id', 'order_index', 'id')),
+    ('ix_financial_expense_profile_order', 'financial_expense', ('profile_id', 'order_index')),
+    ('ix_financial_loan_user_order', 'financial_loan', ('user_id', 'order_index', 'id')),
+    ('ix_financial_loan_profile_order', 'financial_loan', ('profile_id', 'order_index')),
+    ('ix_financial_scenario_user_id', 'financial_scenario', ('user_id',)),
+    ('ix_financial_scenario_profile_id', 'financial_scenario', ('profile_id',)),
+)
+
+
+def upgrade(connection):
+    inspector = db.inspect(connection)
+    for name, table, columns in INDEXES:
+        if name in {index['name'] for index in inspector.get_indexes(table)}:
+            continue
+        connection.execute(db.text(f'CREATE INDEX {name} ON {table} ({", ".join(columns)})'))
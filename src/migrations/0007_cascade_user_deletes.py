@@ -0,0 +1,72 @@
+"""
+ON DELETE CASCADE on every user_id / profile_id foreign key.
+
+SQLite cannot alter a constraint, so its tables are rebuilt: the table is
+reflected, copied into a replacement with the new constraints, swapped in
+by rename and re-indexed. Other databases drop and re-add the constraints.
+Existing rows are copied as they are.
+"""
+
+from sqlalchemy.schema import DropConstraint
+
+from src.models.user import db
+
+DISABLE_FOREIGN_KEYS = True
+
+# Parents before children, so each rebuilt table references an already rebuilt parent
+TABLES = ('financial_profile', 'financial_goal', 'financial_expense', 'financial_loan', 'financial_scenario')
+
+
+def _needs_cascade(connection, table):
+    return [
+        foreign_key for foreign_key in db.inspect(connection).get_foreign_keys(table)
+        if (foreign_key.get('options') or {}).get('ondelete', '').upper() != 'CASCADE'
+    ]
+
+
+def _rebuild_sqlite_table(connection, name):
+    # Reflection pulls the referenced tables into the same MetaData, so the copy's foreign keys resolve
+    metadata = db.MetaData()
+    table = db.Table(name, metadata, autoload_with=connection)
+    indexes = [(index.name, [column.name for column in index.columns], index.unique) for index in table.indexes]
+
+    replacement = table.to_metadata(metadata, name=f'_{name}_rebuild')
+    replacement.indexes.clear()
+    for constraint in replacement.foreign_key_constraints:
+        constraint.ondelete = 'CASCADE'
+    replacement.create(connection)
+
+    columns = ', '.join(column.name for column in table.columns)
+    connection.execute(db.text(f'INSERT INTO {replacement.name} ({columns}) SELECT {columns} FROM {name}'))
+    connection.execute(db.text(f'DROP TABLE {name}'))
+    connection.execute(db.text(f'ALTER TABLE {replacement.name} RENAME TO {name}'))
+    for index_name, index_columns, unique in indexes:
+        connection.execute(db.text(
+            f'CREATE {"UNIQUE " if unique else ""}INDEX {index_name} ON {name} ({", ".join(index_columns)})'
+        ))
+
+
+def _recreate_constraints(connection, name):
+    quote = connection.dialect.identifier_preparer.quote
+    table = db.Table(name, db.MetaData(), autoload_with=connection)
+    for constraint in list(table.foreign_key_constraints):
+        if (constraint.ondelete or '').upper() == 'CASCADE':
+            continue
+        connection.execute(DropConstraint(constraint))
+        referred = constraint.elements[0].column.table.name
+        connection.execute(db.text(
+            f'ALTER TABLE {quote(name)} ADD CONSTRAINT {quote(constraint.name)} '
+            f'FOREIGN KEY ({", ".join(quote(column.name) for column in constraint.columns)}) '
+            f'REFERENCES {quote(referred)} ({", ".join(quote(element.column.name) for element in constraint.elements)}) '
+            f'ON DELETE CASCADE'
+        ))
+
+
+def upgrade(connection):
+    for name in TABLES:
+        if not _needs_cascade(connection, name):
+            continue
+        if connection.dialect.name == 'sqlite':
+            _rebuild_sqlite_table(connection, name)
+        else:
+            _recreate_constraints(connection, name)
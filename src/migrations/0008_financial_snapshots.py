@@ -0,0 +1,28 @@
+"""
+Append-only net-worth snapshot history.
+"""
+
+from src.models.user import db
+
+metadata = db.MetaData()
+# Only the keys the foreign keys point at; create() leaves these tables alone
+db.Table('user', metadata, db.Column('id', db.Integer, primary_key=True))
+db.Table('financial_profile', metadata, db.Column('id', db.Integer, primary_key=True))
+
+# As the table stood when this migration was written, not the live model
+snapshot = db.Table(
+    'financial_snapshot', metadata,
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False),
+    db.Column('profile_id', db.Integer, db.ForeignKey('financial_profile.id', ondelete='CASCADE'), nullable=False),
+    db.Column('taken_at', db.DateTime, nullable=False),
+    db.Column('net_worth', db.Float, nullable=False),
+    db.Column('surplus_deficit', db.Float, nullable=False),
+    db.Column('human_capital', db.Float, nullable=False),
+    db.Index('ix_financial_snapshot_profile_taken', 'profile_id', 'taken_at'),
+    db.Index('ix_financial_snapshot_user_taken', 'user_id', 'taken_at'),
+)
+
+
+def upgrade(connection):
+    snapshot.create(connection, checkfirst=True)
@@ -0,0 +1,65 @@
+"""
+Lower-cased username / email lookup columns with unique indexes.
+
+Existing rows are backfilled in id order. Where two accounts differ only in
+case, the older one gets the lookup key and the newer one gets the key
+suffixed with '#<id>' (and is logged), since the unique index cannot hold
+both; such accounts have to be merged or renamed by hand. Every row ends up
+with a key, so no lookup can match an account through a NULL.
+"""
+
+import logging
+
+from src.models.user import db, normalize_identifier
+from src.services.migrations import add_column_if_missing
+
+logger = logging.getLogger(__name__)
+
+LOOKUPS = (
+    ('username', 'username_normalized', 'VARCHAR(80) NULL', 'ix_user_username_normalized'),
+    ('email', 'email_normalized', 'VARCHAR(120) NULL', 'ix_user_email_normalized'),
+)
+
+
+def upgrade(connection):
+    for _, column, column_type, _ in LOOKUPS:
+        add_column_if_missing(connection, 'user', column, column_type)
+
+    table = db.Table('user', db.MetaData(), autoload_with=connection)
+    for source, column, _, index in LOOKUPS:
+        taken = set(connection.execute(
+            db.select(table.c[column]).where(table.c[column].isnot(None))
+        ).scalars())
+        updates, conflicts = [], []
+        for user_id, value in connection.execute(
+            db.select(table.c.id, table.c[source]).where(table.c[column].is_(None)).order_by(table.c.id)
+        ):
+            key = normalize_identifier(value)
+            if key in taken:
+                conflicts.append((user_id, key))
+                continue
+            taken.add(key)
+            updates.append({'user_id': user_id, 'key': key})
+        for user_id, key in conflicts:
+            # Deterministic, and only typed by someone who already knows the clash
+            fallback = f'{key}#{user_id}'
+            if fallback in taken:
+                raise RuntimeError(f'{source}: cannot give user {user_id} a unique lookup key, '
+                                   f'{fallback!r} is taken; rename the account and migrate again')
+            taken.add(fallback)
+            updates.append({'user_id': user_id, 'key': fallback})
+        if updates:
+            connection.execute(
+                table.update().where(table.c.id == db.bindparam('user_id')).values({column: db.bindparam('key')}),
+                updates
+            )
+        if conflicts:
+            logger.warning(
+                '%s: users %s clash with an older account when compared case-insensitively '
+                "and were given the lookup key '<%s>#<id>'",
+                source, ', '.join(str(user_id) for user_id, _ in conflicts), source
+            )
+
+        if index not in {existing['name'] for existing in db.inspect(connection).get_indexes('user')}:
+            quote = connection.dialect.identifier_preparer.quote
+            connection.execute(db.text(f'CREATE UNIQUE INDEX {index} ON {quote("user")} ({column})'))
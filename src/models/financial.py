@@ -1,10 +1,14 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from src.models.user import db
+from src.models.user import db, bump_data_version
 
 class FinancialProfile(db.Model):
+    __table_args__ = (
+        db.Index('ix_financial_profile_user_id', 'user_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     age = db.Column(db.Integer, nullable=False)
     
     # Core financial inputs based on Excel analysis
@@ -25,11 +29,20 @@ class FinancialProfile(db.Model):
     income_growth_rate = db.Column(db.Float, default=0.06)  # 6% inflation
     asset_growth_rate = db.Column(db.Float, default=0.06)   # 6% inflation
     
+    # Materialized child aggregates, maintained by delta on goal/expense/loan writes
+    goals_total = db.Column(db.Float, default=0)     # Sum of goal amounts
+    expenses_total = db.Column(db.Float, default=0)  # Sum of annual expense amounts
+    loans_total = db.Column(db.Float, default=0)     # Sum of loan amounts
+    emi_total = db.Column(db.Float, default=0)       # Sum of monthly loan EMIs
+    
+    # Highest order_index handed out to this profile's goals, expenses and loans
+    order_counter = db.Column(db.Integer, default=0)
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship with user
-    user = db.relationship('User', backref=db.backref('financial_profiles', lazy=True))
+    user = db.relationship('User', backref=db.backref('financial_profiles', lazy=True, cascade='all, delete', passive_deletes=True))
     
     def __repr__(self):
         return f'<FinancialProfile {self.id} for User {self.user_id}>'
@@ -49,18 +62,14 @@ class FinancialProfile(db.Model):
         return (self.total_loan_outstanding_value or 0)
     
     def calculate_total_future_expenses(self):
-        """Calculate total future expenses from dynamic expense entries"""
-        total = 0
-        for expense in self.expenses:
-            if expense.amount:
-                # Multiply by remaining years (simplified calculation)
-                remaining_years = max(0, (self.lifespan_years or 85) - (self.age or 25))
-                total += expense.amount * remaining_years
-        return total
+        """Calculate total future expenses from the stored annual expense total"""
+        # Multiply by remaining years (simplified calculation)
+        remaining_years = max(0, (self.lifespan_years or 85) - (self.age or 25))
+        return (self.expenses_total or 0) * remaining_years
     
     def calculate_total_financial_goals(self):
-        """Calculate total financial goals from dynamic goal entries"""
-        return sum(goal.amount for goal in self.goals if goal.amount)
+        """Calculate total financial goals from the stored goal total"""
+        return (self.goals_total or 0)
     
     def calculate_current_networth(self):
         """Calculate current net worth"""
@@ -76,8 +85,8 @@ class FinancialProfile(db.Model):
                            self.calculate_total_financial_goals())
         return total_assets - total_liabilities
     
-    def to_dict(self):
-        return {
+    def to_dict(self, include_children=True):
+        profile_dict = {
             'id': self.id,
             'user_id': self.user_id,
             'age': self.age,
@@ -100,9 +109,11 @@ class FinancialProfile(db.Model):
             'income_growth_rate': self.income_growth_rate,
             'asset_growth_rate': self.asset_growth_rate,
             
-            # Dynamic collections
-            'goals': [goal.to_dict() for goal in self.goals],
-            'expenses': [expense.to_dict() for expense in self.expenses],
+            # Materialized aggregates
+            'goals_total': self.goals_total or 0,
+            'expenses_total': self.expenses_total or 0,
+            'loans_total': self.loans_total or 0,
+            'emi_total': self.emi_total or 0,
             
             # Calculated values
             'total_existing_assets': self.calculate_total_existing_assets(),
@@ -114,15 +125,29 @@ class FinancialProfile(db.Model):
             'surplus_deficit': self.calculate_surplus_deficit(),
             
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'loans': [loan.to_dict() for loan in self.loans]
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        
+        if include_children:
+            # Dynamic collections
+            profile_dict['goals'] = [goal.to_dict() for goal in self.goals]
+            profile_dict['expenses'] = [expense.to_dict() for expense in self.expenses]
+            profile_dict['loans'] = [loan.to_dict() for loan in self.loans]
+            
+        return profile_dict
 
 class FinancialGoal(db.Model):
     """Dynamic financial goals - can be added progressively"""
+    __table_args__ = (
+        # List endpoints: WHERE user_id = ? ORDER BY order_index, id
+        db.Index('ix_financial_goal_user_order', 'user_id', 'order_index', 'id'),
+        # Profile loads, ordering and max(order_index) lookups
+        db.Index('ix_financial_goal_profile_order', 'profile_id', 'order_index'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    profile_id = db.Column(db.Integer, db.ForeignKey('financial_profile.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    profile_id = db.Column(db.Integer, db.ForeignKey('financial_profile.id', ondelete='CASCADE'), nullable=False)
     
     # Goal details
     description = db.Column(db.String(255), nullable=False)  # Goal description/name
@@ -138,8 +163,8 @@ class FinancialGoal(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    user = db.relationship('User', backref=db.backref('financial_goals', lazy=True))
-    profile = db.relationship('FinancialProfile', backref=db.backref('goals', lazy=True, order_by='FinancialGoal.order_index'))
+    user = db.relationship('User', backref=db.backref('financial_goals', lazy=True, cascade='all, delete', passive_deletes=True))
+    profile = db.relationship('FinancialProfile', backref=db.backref('goals', lazy=True, order_by='FinancialGoal.order_index', cascade='all, delete', passive_deletes=True))
     
     def __repr__(self):
         return f'<FinancialGoal {self.description} for User {self.user_id}>'
@@ -161,9 +186,16 @@ class FinancialGoal(db.Model):
 
 class FinancialExpense(db.Model):
     """Dynamic financial expenses - can be added progressively"""
+    __table_args__ = (
+        # List endpoints: WHERE user_id = ? ORDER BY order_index, id
+        db.Index('ix_financial_expense_user_order', 'user_id', 'order_index', 'id'),
+        # Profile loads, ordering and max(order_index) lookups
+        db.Index('ix_financial_expense_profile_order', 'profile_id', 'order_index'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    profile_id = db.Column(db.Integer, db.ForeignKey('financial_profile.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    profile_id = db.Column(db.Integer, db.ForeignKey('financial_profile.id', ondelete='CASCADE'), nullable=False)
     
     # Expense details
     description = db.Column(db.String(255), nullable=False)  # Expense description/name
@@ -181,8 +213,8 @@ class FinancialExpense(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    user = db.relationship('User', backref=db.backref('financial_expenses', lazy=True))
-    profile = db.relationship('FinancialProfile', backref=db.backref('expenses', lazy=True, order_by='FinancialExpense.order_index'))
+    user = db.relationship('User', backref=db.backref('financial_expenses', lazy=True, cascade='all, delete', passive_deletes=True))
+    profile = db.relationship('FinancialProfile', backref=db.backref('expenses', lazy=True, order_by='FinancialExpense.order_index', cascade='all, delete', passive_deletes=True))
     
     def __repr__(self):
         return f'<FinancialExpense {self.description} for User {self.user_id}>'
@@ -204,9 +236,14 @@ class FinancialExpense(db.Model):
 
 class FinancialScenario(db.Model):
     """Financial scenarios for what-if analysis"""
+    __table_args__ = (
+        db.Index('ix_financial_scenario_user_id', 'user_id'),
+        db.Index('ix_financial_scenario_profile_id', 'profile_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    profile_id = db.Column(db.Integer, db.ForeignKey('financial_profile.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    profile_id = db.Column(db.Integer, db.ForeignKey('financial_profile.id', ondelete='CASCADE'), nullable=False)
     scenario_name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     
@@ -227,8 +264,8 @@ class FinancialScenario(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    user = db.relationship('User', backref=db.backref('financial_scenarios', lazy=True))
-    profile = db.relationship('FinancialProfile', backref=db.backref('scenarios', lazy=True))
+    user = db.relationship('User', backref=db.backref('financial_scenarios', lazy=True, cascade='all, delete', passive_deletes=True))
+    profile = db.relationship('FinancialProfile', backref=db.backref('scenarios', lazy=True, cascade='all, delete', passive_deletes=True))
     
     def __repr__(self):
         return f'<FinancialScenario {self.scenario_name} for User {self.user_id}>'
@@ -255,9 +292,16 @@ class FinancialScenario(db.Model):
 
 class FinancialLoan(db.Model):
     """Dynamic loans - can be added progressively"""
+    __table_args__ = (
+        # List endpoints: WHERE user_id = ? ORDER BY order_index, id
+        db.Index('ix_financial_loan_user_order', 'user_id', 'order_index', 'id'),
+        # Profile loads, ordering and max(order_index) lookups
+        db.Index('ix_financial_loan_profile_order', 'profile_id', 'order_index'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    profile_id = db.Column(db.Integer, db.ForeignKey('financial_profile.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    profile_id = db.Column(db.Integer, db.ForeignKey('financial_profile.id', ondelete='CASCADE'), nullable=False)
     
     # Loan details
     name = db.Column(db.String(255), nullable=False)  # Loan name/description
@@ -269,8 +313,8 @@ class FinancialLoan(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    user = db.relationship('User', backref=db.backref('financial_loans', lazy=True))
-    profile = db.relationship('FinancialProfile', backref=db.backref('loans', lazy=True, order_by='FinancialLoan.order_index'))
+    user = db.relationship('User', backref=db.backref('financial_loans', lazy=True, cascade='all, delete', passive_deletes=True))
+    profile = db.relationship('FinancialProfile', backref=db.backref('loans', lazy=True, order_by='FinancialLoan.order_index', cascade='all, delete', passive_deletes=True))
     
     def __repr__(self):
         return f'<FinancialLoan {self.name} for User {self.user_id}>'
@@ -288,3 +332,102 @@ class FinancialLoan(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class FinancialSnapshot(db.Model):
+    """Append-only history of a profile's derived totals, one row per committed change"""
+    __table_args__ = (
+        db.Index('ix_financial_snapshot_profile_taken', 'profile_id', 'taken_at'),
+        db.Index('ix_financial_snapshot_user_taken', 'user_id', 'taken_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    profile_id = db.Column(db.Integer, db.ForeignKey('financial_profile.id', ondelete='CASCADE'), nullable=False)
+    taken_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # Values of to_dict()'s current_networth, surplus_deficit and total_human_capital
+    net_worth = db.Column(db.Float, nullable=False)
+    surplus_deficit = db.Column(db.Float, nullable=False)
+    human_capital = db.Column(db.Float, nullable=False)
+    
+    def __repr__(self):
+        return f'<FinancialSnapshot {self.taken_at} for Profile {self.profile_id}>'
+    
+    def to_dict(self):
+        return {
+            'taken_at': self.taken_at.isoformat(),
+            'net_worth': self.net_worth,
+            'surplus_deficit': self.surplus_deficit,
+            'human_capital': self.human_capital
+        }
+
+# Child columns rolled up into FinancialProfile aggregate columns
+AGGREGATED_COLUMNS = {
+    FinancialGoal: (('amount', 'goals_total'),),
+    FinancialExpense: (('amount', 'expenses_total'),),
+    FinancialLoan: (('amount', 'loans_total'), ('emi', 'emi_total')),
+}
+
+def mark_profile_changed(profile_id):
+    """Queue a snapshot of the profile's derived totals when db.session commits"""
+    if profile_id is not None:
+        db.session.info.setdefault('changed_profiles', set()).add(profile_id)
+
+def apply_aggregate_deltas(connection, profile_id, deltas):
+    """Add deltas to a profile's aggregate columns with a single UPDATE"""
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if profile_id is None or not deltas:
+        return
+    mark_profile_changed(profile_id)
+    table = FinancialProfile.__table__
+    connection.execute(
+        table.update()
+        .where(table.c.id == profile_id)
+        .values({column: db.func.coalesce(table.c[column], 0) + delta for column, delta in deltas.items()})
+    )
+
+def _aggregate_values(target):
+    return {total: getattr(target, attribute) or 0 for attribute, total in AGGREGATED_COLUMNS[type(target)]}
+
+def _aggregate_after_insert(mapper, connection, target):
+    apply_aggregate_deltas(connection, target.profile_id, _aggregate_values(target))
+
+def _aggregate_after_delete(mapper, connection, target):
+    values = _aggregate_values(target)
+    apply_aggregate_deltas(connection, target.profile_id, {column: -value for column, value in values.items()})
+
+def _aggregate_after_update(mapper, connection, target):
+    state = db.inspect(target)
+    profile_history = state.attrs.profile_id.history
+    old_profile_id = profile_history.deleted[0] if profile_history.deleted else target.profile_id
+    
+    old_values = {}
+    for attribute, total in AGGREGATED_COLUMNS[type(target)]:
+        history = state.attrs[attribute].history
+        old_values[total] = (history.deleted[0] if history.deleted else getattr(target, attribute)) or 0
+    new_values = _aggregate_values(target)
+    
+    if old_profile_id != target.profile_id:
+        apply_aggregate_deltas(connection, old_profile_id, {column: -value for column, value in old_values.items()})
+        apply_aggregate_deltas(connection, target.profile_id, new_values)
+    else:
+        apply_aggregate_deltas(connection, target.profile_id,
+                               {column: new_values[column] - old_values[column] for column in new_values})
+
+for _model in AGGREGATED_COLUMNS:
+    db.event.listen(_model, 'after_insert', _aggregate_after_insert)
+    db.event.listen(_model, 'after_update', _aggregate_after_update)
+    db.event.listen(_model, 'after_delete', _aggregate_after_delete)
+
+def _bump_user_data_version(mapper, connection, target):
+    bump_data_version(connection, target.user_id)
+
+for _model in (FinancialProfile, FinancialGoal, FinancialExpense, FinancialLoan, FinancialScenario):
+    db.event.listen(_model, 'after_insert', _bump_user_data_version)
+    db.event.listen(_model, 'after_update', _bump_user_data_version)
+    db.event.listen(_model, 'after_delete', _bump_user_data_version)
+
+def _mark_profile_changed(mapper, connection, target):
+    mark_profile_changed(target.id)
+
+db.event.listen(FinancialProfile, 'after_insert', _mark_profile_changed)
+db.event.listen(FinancialProfile, 'after_update', _mark_profile_changed)
@@ -1,13 +1,26 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from src.services.passwords import hasher
+from src.services.routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+def normalize_identifier(value):
+    """Case- and whitespace-insensitive form of a username or email, as stored in the lookup columns"""
+    return value.strip().lower() if value is not None else None
 
 class User(db.Model):
+    __table_args__ = (
+        db.Index('ix_user_username_normalized', 'username_normalized', unique=True),
+        db.Index('ix_user_email_normalized', 'email_normalized', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
+    # Lookup keys kept in step with username / email; login and uniqueness go through these
+    username_normalized = db.Column(db.String(80), nullable=True)
+    email_normalized = db.Column(db.String(120), nullable=True)
     password_hash = db.Column(db.String(255), nullable=False)
     first_name = db.Column(db.String(50), nullable=True)
     last_name = db.Column(db.String(50), nullable=True)
@@ -18,19 +31,36 @@ class User(db.Model):
     # OAuth fields
     oauth_provider = db.Column(db.String(50), nullable=True)  # 'google', 'facebook', etc.
     oauth_id = db.Column(db.String(255), nullable=True)  # OAuth provider's user ID
+    
+    # Bumped on every write to the user's financial data; drives ETag / Last-Modified
+    data_version = db.Column(db.Integer, default=0)
+    data_updated_at = db.Column(db.DateTime, nullable=True)
 
     def __repr__(self):
         return f'<User {self.username}>'
 
+    @db.validates('username')
+    def _normalize_username(self, key, username):
+        self.username_normalized = normalize_identifier(username)
+        return username
+
+    @db.validates('email')
+    def _normalize_email(self, key, email):
+        self.email_normalized = normalize_identifier(email)
+        return email
+
     def set_password(self, password):
         """Hash and set the user's password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hasher.hash(password)
 
     def check_password(self, password):
         """Check if the provided password matches the user's password"""
-        if self.password_hash == 'oauth_user':
-            return False  # OAuth users can't login with password
-        return check_password_hash(self.password_hash, password)
+        # Always False for OAuth users, who have no password
+        return hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """Whether the stored hash predates the current work-factor profile"""
+        return hasher.needs_rehash(self.password_hash)
 
     def to_dict(self, include_sensitive=False):
         user_dict = {
@@ -50,3 +80,14 @@ class User(db.Model):
             user_dict['password_hash'] = self.password_hash
             
         return user_dict
+
+def bump_data_version(connection, user_id):
+    """Mark a user's financial data as changed so cached reads are revalidated"""
+    if user_id is None:
+        return
+    table = User.__table__
+    connection.execute(
+        table.update()
+        .where(table.c.id == user_id)
+        .values(data_version=db.func.coalesce(table.c.data_version, 0) + 1, data_updated_at=datetime.utcnow())
+    )
@@ -1,11 +1,26 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, current_app, session, stream_with_context
 from src.models.user import db, User
 from src.models.financial import FinancialProfile, FinancialGoal, FinancialExpense, FinancialScenario, FinancialLoan
+from src.services.bulk import BulkValidationError, apply_bulk
+from src.services.cache import calculation_cache, canonical_key
+from src.services.export import EXPORT_FORMATS, export_profile, stream_export
+from src.services.http_cache import conditional_on_user_data
+from src.services.importer import ImportValidationError, import_rows, sheet_rows
+from src.services.ordering import allocate_order_indexes, reorder
+from src.services.pagination import NDJSON_MIMETYPE, list_response
+from src.services.projection import CALCULATION_DEFAULTS, calculate, calculate_batch
+from src.services.simulation import simulate
+from src.services.snapshots import history
+from src.services.sweep import sweep
 from datetime import datetime, date
+import csv
 import json
 
 financial_bp = Blueprint('financial', __name__)
 
+# Bump when the calculation changes so stale cached results are never served
+CALCULATE_CACHE_NAMESPACE = 'calculate:v1'
+
 # Financial Profile Routes
 @financial_bp.route('/profile', methods=['POST'])
 def create_financial_profile():
@@ -60,6 +75,7 @@ def create_financial_profile():
         return jsonify({'error': str(e)}), 500
 
 @financial_bp.route('/profile/<int:user_id>', methods=['GET'])
+@conditional_on_user_data
 def get_financial_profile(user_id):
     try:
         profile = FinancialProfile.query.filter_by(user_id=user_id).first()
@@ -71,6 +87,90 @@ def get_financial_profile(user_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@financial_bp.route('/profile/<int:user_id>/summary', methods=['GET'])
+@conditional_on_user_data
+def get_financial_profile_summary(user_id):
+    """Profile with its calculated totals, served from the stored aggregates without loading children"""
+    try:
+        profile = FinancialProfile.query.filter_by(user_id=user_id).first()
+        if not profile:
+            return jsonify({'error': 'Financial profile not found'}), 404
+        
+        return jsonify({'profile': profile.to_dict(include_children=False)}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@financial_bp.route('/history/<int:user_id>', methods=['GET'])
+@conditional_on_user_data
+def get_financial_history(user_id):
+    """Net worth, surplus/deficit and human capital over time, downsampled into buckets"""
+    try:
+        return jsonify(history(user_id, request.args)), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@financial_bp.route('/export/<int:user_id>', methods=['GET'])
+@conditional_on_user_data
+def export_life_sheet(user_id):
+    """Download the profile, collections, calculations and projections as CSV or XLSX"""
+    try:
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'format must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+        profile = export_profile(user_id)
+        
+        # Streamed: rows are read and written while the download is in progress
+        return Response(
+            stream_with_context(stream_export(profile, export_format)),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename="life-sheet-{user_id}.{export_format}"'}
+        ), 200
+        
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@financial_bp.route('/dashboard/<int:user_id>', methods=['GET'])
+@conditional_on_user_data
+def get_financial_dashboard(user_id):
+    """Profile, child collections, calculations and scenarios in one round trip"""
+    try:
+        # One query for the profile plus one SELECT ... IN per collection, however many children exist
+        profile = FinancialProfile.query.options(
+            db.selectinload(FinancialProfile.goals),
+            db.selectinload(FinancialProfile.expenses),
+            db.selectinload(FinancialProfile.loans),
+            db.selectinload(FinancialProfile.scenarios)
+        ).filter_by(user_id=user_id).first()
+        if not profile:
+            return jsonify({'error': 'Financial profile not found'}), 404
+        
+        # Same calculations / projections keys as /calculate, side by side with the profile
+        return jsonify({
+            'profile': profile.to_dict(),
+            **calculate(_profile_calculation_payload(profile)),
+            'scenarios': [scenario.to_dict() for scenario in profile.scenarios]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _profile_calculation_payload(profile):
+    """Build a /calculate payload from a stored profile and its loaded children"""
+    payload = {
+        key: getattr(profile, key) for key in CALCULATION_DEFAULTS
+        if getattr(profile, key) is not None
+    }
+    payload['goals'] = [{'amount': goal.amount} for goal in profile.goals]
+    payload['expenses'] = [{'amount': expense.amount} for expense in profile.expenses]
+    return payload
+
 @financial_bp.route('/profile/<int:profile_id>', methods=['PUT'])
 def update_financial_profile(profile_id):
     try:
@@ -136,10 +236,8 @@ def create_financial_goal():
             if field not in data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        # Get the next order index for this profile
-        max_order = db.session.query(db.func.max(FinancialGoal.order_index)).filter_by(
-            profile_id=data['profile_id']
-        ).scalar() or 0
+        # Reserve the next order index for this profile atomically
+        order_index, = allocate_order_indexes(FinancialGoal, data['profile_id'])
         
         # Create new financial goal
         goal = FinancialGoal(
@@ -147,7 +245,7 @@ def create_financial_goal():
             profile_id=data['profile_id'],
             description=data['description'],
             amount=data['amount'],
-            order_index=max_order + 1,
+            order_index=order_index,
             target_date=datetime.strptime(data['target_date'], '%Y-%m-%d').date() if data.get('target_date') else None,
             priority=data.get('priority', 'medium'),
             status=data.get('status', 'active')
@@ -161,18 +259,22 @@ def create_financial_goal():
             'goal': goal.to_dict()
         }), 201
         
+    except LookupError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @financial_bp.route('/goals/<int:user_id>', methods=['GET'])
+@conditional_on_user_data
 def get_financial_goals(user_id):
     try:
-        goals = FinancialGoal.query.filter_by(user_id=user_id).order_by(FinancialGoal.order_index).all()
-        return jsonify({
-            'goals': [goal.to_dict() for goal in goals]
-        }), 200
+        query = FinancialGoal.query.filter_by(user_id=user_id)
+        return list_response(query, (FinancialGoal.order_index, FinancialGoal.id), 'goals'), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -240,10 +342,8 @@ def create_financial_expense():
             if field not in data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        # Get the next order index for this profile
-        max_order = db.session.query(db.func.max(FinancialExpense.order_index)).filter_by(
-            profile_id=data['profile_id']
-        ).scalar() or 0
+        # Reserve the next order index for this profile atomically
+        order_index, = allocate_order_indexes(FinancialExpense, data['profile_id'])
         
         # Create new financial expense
         expense = FinancialExpense(
@@ -251,7 +351,7 @@ def create_financial_expense():
             profile_id=data['profile_id'],
             description=data['description'],
             amount=data['amount'],
-            order_index=max_order + 1,
+            order_index=order_index,
             expense_type=data.get('expense_type', 'general'),
             frequency=data.get('frequency', 'annual'),
             is_essential=data.get('is_essential', True)
@@ -265,18 +365,22 @@ def create_financial_expense():
             'expense': expense.to_dict()
         }), 201
         
+    except LookupError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @financial_bp.route('/expenses/<int:user_id>', methods=['GET'])
+@conditional_on_user_data
 def get_financial_expenses(user_id):
     try:
-        expenses = FinancialExpense.query.filter_by(user_id=user_id).order_by(FinancialExpense.order_index).all()
-        return jsonify({
-            'expenses': [expense.to_dict() for expense in expenses]
-        }), 200
+        query = FinancialExpense.query.filter_by(user_id=user_id)
+        return list_response(query, (FinancialExpense.order_index, FinancialExpense.id), 'expenses'), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -329,93 +433,219 @@ def delete_financial_expense(expense_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _signed_in_owner(user_id=None):
+    """
+    The signed-in user's id, for routes that rewrite a whole list at once.
+
+    Raises PermissionError when nobody is signed in, or when the request
+    names a `user_id` that is not theirs.
+    """
+    if session.get('user_id') is None:
+        raise PermissionError('Not authenticated')
+    if user_id is not None and user_id != session['user_id']:
+        raise PermissionError('You can only change your own financial data')
+    return session['user_id']
+
+def _permission_denied(error):
+    return jsonify({'error': str(error)}), 401 if session.get('user_id') is None else 403
+
+@financial_bp.route('/goals/bulk', methods=['POST'])
+def bulk_financial_goals():
+    return _bulk_response('goals')
+
+@financial_bp.route('/expenses/bulk', methods=['POST'])
+def bulk_financial_expenses():
+    return _bulk_response('expenses')
+
+@financial_bp.route('/loans/bulk', methods=['POST'])
+def bulk_financial_loans():
+    return _bulk_response('loans')
+
+def _bulk_response(kind):
+    """Apply a batch of creates/updates/deletes and report per-item results"""
+    try:
+        data = request.get_json()
+        _signed_in_owner(data.get('user_id') if isinstance(data, dict) else None)
+        return jsonify(apply_bulk(kind, data)), 200
+        
+    except PermissionError as e:
+        return _permission_denied(e)
+    except BulkValidationError as e:
+        return jsonify({'error': str(e), 'errors': e.errors}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@financial_bp.route('/goals/import', methods=['POST'])
+def import_financial_goals():
+    return _import_response('goals')
+
+@financial_bp.route('/expenses/import', methods=['POST'])
+def import_financial_expenses():
+    return _import_response('expenses')
+
+@financial_bp.route('/loans/import', methods=['POST'])
+def import_financial_loans():
+    return _import_response('loans')
+
+def _import_response(kind):
+    """Import rows from a CSV or XLSX sheet, sent as a multipart 'file' field or as the raw body"""
+    try:
+        user_id = request.values.get('user_id', type=int)
+        profile_id = request.values.get('profile_id', type=int)
+        if user_id is None or profile_id is None:
+            return jsonify({'error': 'user_id and profile_id are required'}), 400
+        _signed_in_owner(user_id)
+        
+        upload = request.files.get('file')
+        if upload:
+            rows = sheet_rows(upload.stream, upload.filename, upload.mimetype, request.values.get('sheet', kind))
+        else:
+            rows = sheet_rows(request.stream, None, request.mimetype, request.values.get('sheet', kind))
+        
+        result = import_rows(kind, user_id, profile_id, rows, skip_invalid=request.values.get('skip_invalid') == '1')
+        return jsonify(result), 200
+        
+    except PermissionError as e:
+        return _permission_denied(e)
+    except ImportValidationError as e:
+        return jsonify({'error': str(e), 'error_count': e.error_count, 'errors': e.errors}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except (ValueError, csv.Error) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@financial_bp.route('/goals/reorder', methods=['PATCH'])
+def reorder_financial_goals():
+    return _reorder_response('goals')
+
+@financial_bp.route('/expenses/reorder', methods=['PATCH'])
+def reorder_financial_expenses():
+    return _reorder_response('expenses')
+
+@financial_bp.route('/loans/reorder', methods=['PATCH'])
+def reorder_financial_loans():
+    return _reorder_response('loans')
+
+def _reorder_response(kind):
+    """Move items by giving each a sparse order_index between its new neighbours"""
+    try:
+        data = request.get_json()
+        return jsonify({kind: reorder(kind, data, _signed_in_owner())}), 200
+        
+    except PermissionError as e:
+        return _permission_denied(e)
+    except LookupError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # Financial Calculations Route
 @financial_bp.route('/calculate', methods=['POST'])
 def calculate_financial_projections():
     try:
         data = request.get_json()
+        if calculation_cache is None:
+            return jsonify(calculate(data)), 200
+        
+        # The result is a pure function of the body, so identical inputs share one cached response
+        key = canonical_key(CALCULATE_CACHE_NAMESPACE, data)
+        body, hit = calculation_cache.get_or_compute(key, lambda: current_app.json.dumps(calculate(data)))
+        response = Response(body, mimetype='application/json')
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response, 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@financial_bp.route('/calculate/cache', methods=['GET'])
+def get_calculation_cache_stats():
+    try:
+        if calculation_cache is None:
+            return jsonify({'cache': None}), 200
+        return jsonify({'cache': calculation_cache.stats()}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@financial_bp.route('/calculate/batch', methods=['POST'])
+def calculate_financial_projections_batch():
+    """Evaluate many /calculate payloads in one call, streaming results back in order"""
+    try:
+        if request.mimetype == NDJSON_MIMETYPE:
+            # One payload per line; results go back one per line as they are computed
+            results = calculate_batch(_ndjson_payloads(request.stream))
+            body = (json.dumps(result) + '\n' for result in results)
+            return Response(stream_with_context(body), mimetype=NDJSON_MIMETYPE), 200
+        
+        data = request.get_json()
+        payloads = data.get('profiles') if isinstance(data, dict) else data
+        if not isinstance(payloads, list):
+            return jsonify({'error': 'Expected a list of calculation inputs or {"profiles": [...]}'}), 400
         
-        # Extract input data
-        age = data.get('age', 30)
-        current_annual_gross_income = data.get('current_annual_gross_income', 0)
-        work_tenure_years = data.get('work_tenure_years', 0)
-        total_asset_gross_market_value = data.get('total_asset_gross_market_value', 0)
-        total_loan_outstanding_value = data.get('total_loan_outstanding_value', 0)
-        
-        # Growth assumptions based on Excel analysis
-        income_growth_rate = data.get('income_growth_rate', 0.06)  # 6% inflation
-        asset_growth_rate = data.get('asset_growth_rate', 0.06)    # 6% inflation
-        lifespan_years = data.get('lifespan_years', 85)
-        
-        # Calculate financial metrics based on Excel logic
-        retirement_age = 65
-        remaining_years = max(0, min(work_tenure_years, retirement_age - age))
-        
-        # Total Human Capital calculation (simple multiplication, no growth)
-        total_human_capital = current_annual_gross_income * work_tenure_years
-        
-        # Total Existing Assets
-        total_existing_assets = total_asset_gross_market_value
-        
-        # Total Existing Liabilities
-        total_existing_liabilities = total_loan_outstanding_value
-        
-        # Current Net Worth
-        current_networth = total_existing_assets - total_existing_liabilities
-        
-        # Total Future Expenses (from dynamic expenses)
-        total_future_expenses = 0
-        if 'expenses' in data:
-            for expense in data['expenses']:
-                expense_amount = expense.get('amount', 0)
-                # Multiply by remaining life years
-                remaining_life_years = max(0, lifespan_years - age)
-                total_future_expenses += expense_amount * remaining_life_years
-        
-        # Total Financial Goals (from dynamic goals)
-        total_financial_goals = 0
-        if 'goals' in data:
-            for goal in data['goals']:
-                total_financial_goals += goal.get('amount', 0)
-        
-        # Surplus/Deficit calculation
-        total_assets = total_existing_assets + total_human_capital
-        total_liabilities = total_existing_liabilities + total_future_expenses + total_financial_goals
-        surplus_deficit = total_assets - total_liabilities
-        
-        # Generate projection data for chart
-        projections = []
-        current_year = 2025  # Base year from Excel
-        
-        for year in range(0, min(remaining_years + 1, 26), 1):
-            # Calculate projected values
-            projected_income = current_annual_gross_income * ((1 + income_growth_rate) ** year) if year < remaining_years else 0
-            projected_assets = total_asset_gross_market_value * ((1 + asset_growth_rate) ** year)
-            
-            projections.append({
-                'year': current_year + year,
-                'age': age + year,
-                'income': round(projected_income),
-                'assets': round(projected_assets),
-                'human_capital': round(projected_income * max(0, remaining_years - year)) if year < remaining_years else 0
-            })
+        return Response(stream_with_context(_json_array(calculate_batch(payloads))), mimetype='application/json'), 200
         
-        return jsonify({
-            'calculations': {
-                'total_existing_assets': round(total_existing_assets),
-                'total_human_capital': round(total_human_capital),
-                'total_existing_liabilities': round(total_existing_liabilities),
-                'total_future_expenses': round(total_future_expenses),
-                'total_financial_goals': round(total_financial_goals),
-                'current_networth': round(current_networth),
-                'surplus_deficit': round(surplus_deficit)
-            },
-            'projections': projections
-        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@financial_bp.route('/simulate', methods=['POST'])
+def simulate_financial_projections():
+    """Monte Carlo version of /calculate with stochastic returns and inflation"""
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Calculation input must be a JSON object'}), 400
+        return jsonify(simulate(data)), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@financial_bp.route('/sweep', methods=['POST'])
+def sweep_financial_projections():
+    """Evaluate /calculate over a grid of input ranges in one call"""
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Calculation input must be a JSON object'}), 400
+        return jsonify(sweep(data)), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _ndjson_payloads(stream):
+    """Parse NDJSON lines lazily; malformed lines become None so they surface as per-item errors"""
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+def _json_array(items):
+    """Stream an iterable as a JSON array without building it in memory"""
+    yield '['
+    for position, item in enumerate(items):
+        yield (',' if position else '') + json.dumps(item)
+    yield ']'
+
 # Financial Scenarios Routes
 @financial_bp.route('/scenarios', methods=['POST'])
 def create_financial_scenario():
@@ -458,13 +688,14 @@ def create_financial_scenario():
         return jsonify({'error': str(e)}), 500
 
 @financial_bp.route('/scenarios/<int:user_id>', methods=['GET'])
+@conditional_on_user_data
 def get_financial_scenarios(user_id):
     try:
-        scenarios = FinancialScenario.query.filter_by(user_id=user_id).all()
-        return jsonify({
-            'scenarios': [scenario.to_dict() for scenario in scenarios]
-        }), 200
+        query = FinancialScenario.query.filter_by(user_id=user_id)
+        return list_response(query, (FinancialScenario.id,), 'scenarios'), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -477,30 +708,34 @@ def create_financial_loan():
         for field in required_fields:
             if field not in data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
-        # Get the next order index for this profile
-        max_order = db.session.query(db.func.max(FinancialLoan.order_index)).filter_by(
-            profile_id=data['profile_id']
-        ).scalar() or 0
+        # Reserve the next order index for this profile atomically
+        order_index, = allocate_order_indexes(FinancialLoan, data['profile_id'])
         loan = FinancialLoan(
             user_id=data['user_id'],
             profile_id=data['profile_id'],
             name=data['name'],
             amount=data['amount'],
             emi=data.get('emi'),  # EMI is optional
-            order_index=max_order + 1
+            order_index=order_index
         )
         db.session.add(loan)
         db.session.commit()
         return jsonify({'message': 'Financial loan created successfully', 'loan': loan.to_dict()}), 201
+    except LookupError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @financial_bp.route('/loans/<int:user_id>', methods=['GET'])
+@conditional_on_user_data
 def get_financial_loans(user_id):
     try:
-        loans = FinancialLoan.query.filter_by(user_id=user_id).order_by(FinancialLoan.order_index).all()
-        return jsonify({'loans': [loan.to_dict() for loan in loans]}), 200
+        query = FinancialLoan.query.filter_by(user_id=user_id)
+        return list_response(query, (FinancialLoan.order_index, FinancialLoan.id), 'loans'), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
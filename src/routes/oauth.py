@@ -2,7 +2,9 @@ from flask import Blueprint, request, jsonify, redirect, url_for, session
 import requests
 import secrets
 import os
-from src.models.user import db, User
+from src.models.user import db, User, normalize_identifier
+from src.services.http_client import ProviderUnavailable, provider_client
+from src.services.id_tokens import IdTokenError, JwksCache, verify_id_token
 from datetime import datetime
 
 oauth_bp = Blueprint('oauth', __name__)
@@ -13,14 +15,32 @@ GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET', 'demo-google-secret')
 FACEBOOK_APP_ID = os.getenv('FACEBOOK_APP_ID', 'demo-facebook-app-id')
 FACEBOOK_APP_SECRET = os.getenv('FACEBOOK_APP_SECRET', 'demo-facebook-secret')
 
-# OAuth URLs
+# OAuth URLs (the server-side ones can be pointed at a local stub provider)
 GOOGLE_AUTH_URL = 'https://accounts.google.com/o/oauth2/auth'
-GOOGLE_TOKEN_URL = 'https://oauth2.googleapis.com/token'
-GOOGLE_USER_INFO_URL = 'https://www.googleapis.com/oauth2/v2/userinfo'
+GOOGLE_TOKEN_URL = os.getenv('GOOGLE_TOKEN_URL', 'https://oauth2.googleapis.com/token')
+GOOGLE_USER_INFO_URL = os.getenv('GOOGLE_USER_INFO_URL', 'https://www.googleapis.com/oauth2/v2/userinfo')
+GOOGLE_JWKS_URL = os.getenv('GOOGLE_JWKS_URL', 'https://www.googleapis.com/oauth2/v3/certs')
+GOOGLE_ISSUERS = ('https://accounts.google.com', 'accounts.google.com')
 
 FACEBOOK_AUTH_URL = 'https://www.facebook.com/v18.0/dialog/oauth'
-FACEBOOK_TOKEN_URL = 'https://graph.facebook.com/v18.0/oauth/access_token'
-FACEBOOK_USER_INFO_URL = 'https://graph.facebook.com/me'
+FACEBOOK_TOKEN_URL = os.getenv('FACEBOOK_TOKEN_URL', 'https://graph.facebook.com/v18.0/oauth/access_token')
+FACEBOOK_USER_INFO_URL = os.getenv('FACEBOOK_USER_INFO_URL', 'https://graph.facebook.com/me')
+
+# Google's signing keys, for checking ID tokens without a userinfo call
+google_jwks = JwksCache('google', GOOGLE_JWKS_URL)
+
+def google_id_token_user(id_token):
+    """Profile fields from a verified Google ID token, shaped like the userinfo response"""
+    claims = verify_id_token(id_token, google_jwks, GOOGLE_CLIENT_ID, GOOGLE_ISSUERS)
+    # Accounts are matched by email, so only an address Google says it verified may be trusted
+    if claims.get('email_verified') is not True:
+        raise IdTokenError('Google account email is not verified')
+    return {
+        'id': claims['sub'],
+        'email': claims.get('email'),
+        'given_name': claims.get('given_name', ''),
+        'family_name': claims.get('family_name', '')
+    }
 
 @oauth_bp.route('/google/login', methods=['GET'])
 def google_login():
@@ -71,16 +91,21 @@ def google_callback():
             'redirect_uri': request.url_root.rstrip('/') + '/api/oauth/google/callback'
         }
         
-        token_response = requests.post(GOOGLE_TOKEN_URL, data=token_data)
+        token_response = provider_client.post('google', GOOGLE_TOKEN_URL, data=token_data, idempotent=False)
         token_json = token_response.json()
         
         if 'access_token' not in token_json:
             return jsonify({'error': 'Failed to get access token'}), 400
             
-        # Get user info from Google
-        headers = {'Authorization': f'Bearer {token_json["access_token"]}'}
-        user_response = requests.get(GOOGLE_USER_INFO_URL, headers=headers)
-        user_data = user_response.json()
+        # Get user info from the signed ID token, or from Google if there is none
+        if 'id_token' in token_json:
+            user_data = google_id_token_user(token_json['id_token'])
+        else:
+            headers = {'Authorization': f'Bearer {token_json["access_token"]}'}
+            user_response = provider_client.get('google', GOOGLE_USER_INFO_URL, headers=headers)
+            user_data = user_response.json()
+            if user_data.get('verified_email') is not True:
+                raise IdTokenError('Google account email is not verified')
         
         # Create or get user
         user = create_or_get_oauth_user(user_data, 'google')
@@ -93,6 +118,14 @@ def google_callback():
         frontend_url = os.getenv('FRONTEND_URL', 'https://doizqmuw.manus.space')
         return redirect(f'{frontend_url}?oauth_success=true&provider=google')
         
+    except IdTokenError as e:
+        return jsonify({'error': str(e)}), 401
+    except ProviderUnavailable as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(max(1, round(e.retry_after)))}
+    except requests.RequestException:
+        return jsonify({'error': 'Google did not respond, please try again'}), 502
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -144,7 +177,7 @@ def facebook_callback():
             'redirect_uri': request.url_root.rstrip('/') + '/api/oauth/facebook/callback'
         }
         
-        token_response = requests.get(FACEBOOK_TOKEN_URL, params=token_params)
+        token_response = provider_client.get('facebook', FACEBOOK_TOKEN_URL, params=token_params, idempotent=False)
         token_json = token_response.json()
         
         if 'access_token' not in token_json:
@@ -155,7 +188,7 @@ def facebook_callback():
             'access_token': token_json['access_token'],
             'fields': 'id,name,email,first_name,last_name'
         }
-        user_response = requests.get(FACEBOOK_USER_INFO_URL, params=user_params)
+        user_response = provider_client.get('facebook', FACEBOOK_USER_INFO_URL, params=user_params)
         user_data = user_response.json()
         
         # Create or get user
@@ -169,6 +202,12 @@ def facebook_callback():
         frontend_url = os.getenv('FRONTEND_URL', 'https://doizqmuw.manus.space')
         return redirect(f'{frontend_url}?oauth_success=true&provider=facebook')
         
+    except ProviderUnavailable as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(max(1, round(e.retry_after)))}
+    except requests.RequestException:
+        return jsonify({'error': 'Facebook did not respond, please try again'}), 502
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -190,9 +229,13 @@ def create_or_get_oauth_user(user_data, provider):
             username = email.split('@')[0] if email else f'facebook_user_{oauth_id}'
         else:
             raise ValueError(f'Unsupported OAuth provider: {provider}')
+        
+        # The email is what links the sign-in to an account; never look one up without it
+        if not isinstance(email, str) or not email.strip():
+            raise ValueError(f'{provider.capitalize()} did not share an email address for this account')
             
         # Check if user already exists by email
-        existing_user = User.query.filter_by(email=email).first()
+        existing_user = User.query.filter_by(email_normalized=normalize_identifier(email)).first()
         if existing_user:
             # Update last login
             existing_user.last_login = datetime.utcnow()
@@ -203,7 +246,7 @@ def create_or_get_oauth_user(user_data, provider):
         # Make username unique if it already exists
         base_username = username
         counter = 1
-        while User.query.filter_by(username=username).first():
+        while User.query.filter_by(username_normalized=normalize_identifier(username)).first():
             username = f'{base_username}_{counter}'
             counter += 1
             
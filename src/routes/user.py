@@ -1,5 +1,10 @@
-from flask import Blueprint, jsonify, request, session
-from src.models.user import User, db
+from flask import Blueprint, current_app, jsonify, request, session
+from sqlalchemy.exc import IntegrityError
+from src.models.user import User, db, normalize_identifier
+from src.services.passwords import PasswordHashingBusy
+from src.services.pagination import list_response
+from src.services.purge import purge_user, purge_user_in_background
+from src.services.rate_limit import charge_failed_login
 from datetime import datetime
 import re
 
@@ -10,6 +15,14 @@ def validate_email(email):
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(pattern, email) is not None
 
+# How SQLite, MySQL and PostgreSQL name the email uniqueness constraints in their errors
+EMAIL_CONSTRAINTS = ('email_normalized', 'user.email', 'user_email_key')
+
+def duplicate_field(error):
+    """'Username' or 'Email': which uniqueness constraint an IntegrityError on the user table violated"""
+    message = str(error.orig)
+    return 'Email' if any(name in message for name in EMAIL_CONSTRAINTS) else 'Username'
+
 def validate_password(password):
     """Validate password strength"""
     if len(password) < 6:
@@ -37,15 +50,11 @@ def register():
         if not is_valid:
             return jsonify({'error': message}), 400
         
-        # Check if username already exists
-        if User.query.filter_by(username=data['username']).first():
-            return jsonify({'error': 'Username already exists'}), 409
+        # Login tells usernames and emails apart by the @
+        if '@' in data['username']:
+            return jsonify({'error': 'Username cannot contain @'}), 400
         
-        # Check if email already exists
-        if User.query.filter_by(email=data['email']).first():
-            return jsonify({'error': 'Email already exists'}), 409
-        
-        # Create new user
+        # Create new user; the unique lookup indexes reject a taken username or email
         user = User(
             username=data['username'],
             email=data['email'],
@@ -55,7 +64,11 @@ def register():
         user.set_password(data['password'])
         
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            return jsonify({'error': f'{duplicate_field(e)} already exists'}), 409
         
         # Set session
         session['user_id'] = user.id
@@ -66,6 +79,9 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -78,31 +94,46 @@ def login():
         # Validate required fields
         if 'username' not in data or 'password' not in data:
             return jsonify({'error': 'Username and password are required'}), 400
-        
-        # Find user by username or email
-        user = User.query.filter(
-            (User.username == data['username']) | (User.email == data['username'])
-        ).first()
+        if not isinstance(data['username'], str) or not isinstance(data['password'], str):
+            return jsonify({'error': 'Username and password must be strings'}), 400
+        
+        # Find user by username or email: probe the lookup index the input's shape points to,
+        # falling back to usernames for accounts created before usernames were barred from holding an @
+        identifier = normalize_identifier(data['username'])
+        user = None
+        if '@' in identifier:
+            user = User.query.filter(User.email_normalized == identifier).first()
+        if user is None:
+            user = User.query.filter(User.username_normalized == identifier).first()
         
         if not user or not user.check_password(data['password']):
+            charge_failed_login(data['username'])
             return jsonify({'error': 'Invalid username or password'}), 401
         
         if not user.is_active:
             return jsonify({'error': 'Account is deactivated'}), 401
         
-        # Update last login
+        # Upgrade a hash made under an older work factor while the password is at hand
+        if user.password_needs_rehash():
+            user.set_password(data['password'])
+        
+        # Update last login; serialize first, as the commit expires the loaded row
         user.last_login = datetime.utcnow()
+        user_dict = user.to_dict()
         db.session.commit()
         
         # Set session
-        session['user_id'] = user.id
-        session['username'] = user.username
+        session['user_id'] = user_dict['id']
+        session['username'] = user_dict['username']
         
         return jsonify({
             'message': 'Login successful',
-            'user': user.to_dict()
+            'user': user_dict
         }), 200
         
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -149,13 +180,14 @@ def update_profile():
         if 'email' in data:
             if not validate_email(data['email']):
                 return jsonify({'error': 'Invalid email format'}), 400
-            # Check if email is already taken by another user
-            existing_user = User.query.filter_by(email=data['email']).first()
-            if existing_user and existing_user.id != user.id:
-                return jsonify({'error': 'Email already exists'}), 409
             user.email = data['email']
         
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # The email is already taken by another user
+            db.session.rollback()
+            return jsonify({'error': 'Email already exists'}), 409
         
         return jsonify({
             'message': 'Profile updated successfully',
@@ -199,6 +231,9 @@ def change_password():
         
         return jsonify({'message': 'Password changed successfully'}), 200
         
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -207,8 +242,9 @@ def change_password():
 @user_bp.route('/users', methods=['GET'])
 def get_users():
     try:
-        users = User.query.all()
-        return jsonify([user.to_dict() for user in users]), 200
+        return list_response(User.query, (User.id,), 'users', bare_list=True), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -222,11 +258,16 @@ def get_user(user_id):
 
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
+    """Delete a user and all of their data; ?background=1 purges in chunks after responding"""
     try:
-        user = User.query.get_or_404(user_id)
-        db.session.delete(user)
-        db.session.commit()
-        return jsonify({'message': 'User deleted successfully'}), 200
+        if request.args.get('background') == '1':
+            purge_user_in_background(current_app._get_current_object(), user_id)
+            return jsonify({'message': 'User deletion started'}), 202
+        
+        deleted = purge_user(user_id)
+        return jsonify({'message': 'User deleted successfully', 'deleted': deleted}), 200
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,54 @@
+"""
+Verification and rebuild of the materialized FinancialProfile aggregates.
+
+The aggregate columns are kept up to date by mapper events on every ORM
+write. This module recomputes them from the child rows, for repairing drift
+after bulk SQL or for back-filling freshly added columns.
+"""
+
+from src.models.user import db
+from src.models.financial import AGGREGATED_COLUMNS, FinancialProfile
+
+# Floating point sums may differ in the last bits depending on summation order
+TOLERANCE = 1e-6
+
+
+def expected_aggregates():
+    """Aggregate totals per profile recomputed from the child tables, one GROUP BY per column"""
+    expected = {}
+    for model, columns in AGGREGATED_COLUMNS.items():
+        for attribute, total in columns:
+            rows = db.session.query(
+                model.profile_id, db.func.coalesce(db.func.sum(getattr(model, attribute)), 0)
+            ).group_by(model.profile_id)
+            for profile_id, value in rows:
+                expected.setdefault(profile_id, {})[total] = value
+    return expected
+
+
+def verify_profile_aggregates(fix=False):
+    """
+    Compare stored aggregates against the child rows.
+
+    Returns a list of {'profile_id', 'column', 'stored', 'expected'} for every
+    mismatch. With fix=True the mismatched columns are rewritten and committed.
+    """
+    expected = expected_aggregates()
+    totals = [total for columns in AGGREGATED_COLUMNS.values() for _, total in columns]
+
+    drift = []
+    rows = db.session.query(FinancialProfile.id, *[getattr(FinancialProfile, total) for total in totals])
+    for profile_id, *stored_values in rows:
+        for total, stored in zip(totals, stored_values):
+            value = expected.get(profile_id, {}).get(total, 0)
+            if stored is None or abs(stored - value) > TOLERANCE * max(1, abs(value)):
+                drift.append({'profile_id': profile_id, 'column': total, 'stored': stored, 'expected': value})
+
+    if fix and drift:
+        table = FinancialProfile.__table__
+        for record in drift:
+            db.session.execute(
+                table.update().where(table.c.id == record['profile_id']).values({record['column']: record['expected']})
+            )
+        db.session.commit()
+    return drift
@@ -0,0 +1,234 @@
+"""
+Bulk create/update/delete for goals, expenses and loans.
+
+A whole batch is validated before anything is written, then applied with
+set-based statements: one order_index allocation for all creates, executemany
+INSERT and UPDATE, a single DELETE ... IN, and one commit. ORM bulk
+statements skip the mapper events, so the profile aggregates and the user's
+data version are adjusted here explicitly.
+"""
+
+import math
+from datetime import datetime
+
+from src.models.user import db, bump_data_version
+from src.models.financial import (
+    AGGREGATED_COLUMNS, FinancialExpense, FinancialGoal, FinancialLoan, FinancialProfile, apply_aggregate_deltas,
+)
+from src.services.ordering import allocate_order_indexes
+
+MAX_BULK_ITEMS = 1000
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    if not isinstance(value, str):
+        raise ValueError('Invalid target_date: expected YYYY-MM-DD')
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _is_finite(value):
+    try:
+        return math.isfinite(value)
+    except OverflowError:
+        # An int too large for a float
+        return False
+
+
+BULK_RESOURCES = {
+    'goals': {
+        'model': FinancialGoal,
+        'required': ('description', 'amount'),
+        'fields': ('description', 'amount', 'target_date', 'priority', 'status'),
+        'defaults': {'priority': 'medium', 'status': 'active'},
+        'converters': {'target_date': _parse_date},
+    },
+    'expenses': {
+        'model': FinancialExpense,
+        'required': ('description', 'amount'),
+        'fields': ('description', 'amount', 'expense_type', 'frequency', 'is_essential'),
+        'defaults': {'expense_type': 'general', 'frequency': 'annual', 'is_essential': True},
+        'converters': {},
+    },
+    'loans': {
+        'model': FinancialLoan,
+        'required': ('name', 'amount'),
+        'fields': ('name', 'amount', 'emi'),
+        'defaults': {'emi': None},
+        'converters': {},
+    },
+}
+
+# Numeric fields; 'emi' may also be null
+NUMERIC_FIELDS = ('amount', 'emi')
+
+
+class BulkValidationError(ValueError):
+    """Raised with per-item errors when any item in a batch is invalid"""
+
+    def __init__(self, errors):
+        super().__init__('Validation failed')
+        self.errors = errors
+
+
+def clean_fields(resource, item, required):
+    """Validated and converted column values from one request item"""
+    if required:
+        for field in resource['required']:
+            if field not in item:
+                raise ValueError(f'Missing required field: {field}')
+
+    values = {}
+    for field in resource['fields']:
+        if field not in item:
+            continue
+        value = item[field]
+        if field in NUMERIC_FIELDS:
+            nullable = field == 'emi'
+            if (value is None and not nullable) or isinstance(value, bool) or (
+                    value is not None and not isinstance(value, (int, float))):
+                raise ValueError(f'Invalid numeric value for {field}')
+            # NaN and infinities would poison the profile totals and every calculation built on them
+            if value is not None and not _is_finite(value):
+                raise ValueError(f'{field} must be a finite number')
+        converter = resource['converters'].get(field)
+        values[field] = converter(value) if converter else value
+    return values
+
+
+def aggregate_values(model, values):
+    return {total: values.get(attribute) or 0 for attribute, total in AGGREGATED_COLUMNS[model]}
+
+
+def apply_bulk(kind, data):
+    """
+    Apply a batch of creates, updates and deletes to one profile in a single transaction.
+
+    Returns {'created': [...], 'updated': [...], 'deleted': [...]} in request
+    order. Raises BulkValidationError before writing if any item is invalid,
+    and LookupError if the profile does not exist.
+    """
+    resource = BULK_RESOURCES[kind]
+    model = resource['model']
+
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object')
+    for field in ('user_id', 'profile_id'):
+        if field not in data:
+            raise ValueError(f'Missing required field: {field}')
+    creates, updates, deletes = data.get('create') or [], data.get('update') or [], data.get('delete') or []
+    if not all(isinstance(items, list) for items in (creates, updates, deletes)):
+        raise ValueError('create, update and delete must be lists')
+    if len(creates) + len(updates) + len(deletes) > MAX_BULK_ITEMS:
+        raise ValueError(f'A batch may contain at most {MAX_BULK_ITEMS} items')
+
+    profile = FinancialProfile.query.get(data['profile_id'])
+    if not profile:
+        raise LookupError('Financial profile not found')
+    if profile.user_id != data['user_id']:
+        raise ValueError('Profile does not belong to this user')
+
+    # Existing rows touched by the batch, fetched once for validation and aggregate deltas
+    target_ids = [item.get('id') for item in updates if isinstance(item, dict)] + list(deletes)
+    target_ids = [item_id for item_id in target_ids if isinstance(item_id, int) and not isinstance(item_id, bool)]
+    existing = {
+        row.id: row for row in model.query.filter(model.profile_id == profile.id, model.id.in_(target_ids))
+    } if target_ids else {}
+
+    errors = []
+    rows_to_create = []
+    for index, item in enumerate(creates):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError('Item must be a JSON object')
+            values = dict(resource['defaults'])
+            values.update(clean_fields(resource, item, required=True))
+            rows_to_create.append(values)
+        except ValueError as e:
+            errors.append({'op': 'create', 'index': index, 'error': str(e)})
+
+    rows_to_update = []
+    seen_ids = set()
+    for index, item in enumerate(updates):
+        try:
+            item_id = item.get('id') if isinstance(item, dict) else None
+            if not isinstance(item_id, int) or isinstance(item_id, bool) or item_id not in existing:
+                raise ValueError(f'{model.__name__} not found')
+            if item_id in seen_ids:
+                raise ValueError('Item appears more than once in the batch')
+            seen_ids.add(item_id)
+            rows_to_update.append(dict(clean_fields(resource, item, required=False), id=item_id))
+        except ValueError as e:
+            errors.append({'op': 'update', 'index': index, 'error': str(e)})
+
+    for index, item_id in enumerate(deletes):
+        # Type first: a list or object id must not reach the set and dict lookups
+        if not isinstance(item_id, int) or isinstance(item_id, bool) or item_id not in existing:
+            errors.append({'op': 'delete', 'index': index, 'error': f'{model.__name__} not found'})
+        elif item_id in seen_ids:
+            errors.append({'op': 'delete', 'index': index, 'error': 'Item appears more than once in the batch'})
+        else:
+            seen_ids.add(item_id)
+
+    if errors:
+        raise BulkValidationError(errors)
+
+    now = datetime.utcnow()
+    deltas = {total: 0 for _, total in AGGREGATED_COLUMNS[model]}
+
+    if rows_to_create:
+        # One atomic counter update allocates order indexes for the whole batch
+        order_indexes = allocate_order_indexes(model, profile.id, len(rows_to_create))
+        for order_index, values in zip(order_indexes, rows_to_create):
+            values.update(user_id=profile.user_id, profile_id=profile.id, order_index=order_index,
+                          created_at=now, updated_at=now)
+            for total, value in aggregate_values(model, values).items():
+                deltas[total] += value
+        db.session.execute(db.insert(model), rows_to_create)
+
+    if rows_to_update:
+        for values in rows_to_update:
+            row = existing[values['id']]
+            old = aggregate_values(model, {attribute: getattr(row, attribute) for attribute in resource['fields']})
+            new = aggregate_values(model, {
+                attribute: values.get(attribute, getattr(row, attribute)) for attribute in resource['fields']
+            })
+            for total in deltas:
+                deltas[total] += new[total] - old[total]
+            values['updated_at'] = now
+        db.session.execute(db.update(model), rows_to_update)
+
+    if deletes:
+        for item_id in deletes:
+            for total, value in aggregate_values(model, {
+                attribute: getattr(existing[item_id], attribute) for attribute in resource['fields']
+            }).items():
+                deltas[total] -= value
+        db.session.execute(db.delete(model).where(model.id.in_(deletes)), execution_options={'synchronize_session': False})
+
+    profile_id = profile.id
+    connection = db.session.connection()
+    apply_aggregate_deltas(connection, profile_id, deltas)
+    bump_data_version(connection, profile.user_id)
+    db.session.commit()
+
+    # Read results back after the commit so serialization does not refresh rows one by one
+    created = []
+    if rows_to_create:
+        created = model.query.filter(
+            model.profile_id == profile_id,
+            model.order_index >= order_indexes[0],
+            model.order_index <= order_indexes[-1]
+        ).order_by(model.order_index).all()
+
+    updated = []
+    if rows_to_update:
+        by_id = {row.id: row for row in model.query.filter(model.id.in_([values['id'] for values in rows_to_update]))}
+        updated = [by_id[values['id']] for values in rows_to_update]
+
+    return {
+        'created': [row.to_dict() for row in created],
+        'updated': [row.to_dict() for row in updated],
+        'deleted': list(deletes),
+    }
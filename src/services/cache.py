@@ -0,0 +1,214 @@
+"""
+Content-addressed result cache for the pure calculation endpoints.
+
+Keys are SHA-256 hashes of a canonical form of the request body: sorted keys,
+ints and floats unified, and the goal/expense lists treated as unordered.
+Values are the serialized response bodies, so a hit skips both the
+calculation and the JSON encoding.
+
+Two backends are available: an in-process LRU (default) and a SQLite file
+shared by every worker on the node. Both evict least recently used entries
+past a size bound and expire entries after a TTL. The SQLite backend keeps
+an approximate LRU: a hit only rewrites an entry's access time once it is
+ACCESS_TIME_RESOLUTION seconds old, so most hits are a plain read and do
+not queue behind other workers for the write lock.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds an entry's recorded access time may lag behind its last hit (SQLite backend)
+ACCESS_TIME_RESOLUTION = 60
+
+# List fields whose order does not change the calculation result
+UNORDERED_FIELDS = ('goals', 'expenses')
+
+
+def _normalize(value, unordered=False):
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        # 100 and 100.0 must hash the same
+        return float(value)
+    if isinstance(value, dict):
+        return {str(key): _normalize(item, key in UNORDERED_FIELDS) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [_normalize(item) for item in value]
+        if unordered:
+            items.sort(key=lambda item: json.dumps(item, sort_keys=True))
+        return items
+    raise ValueError(f'Unsupported value in cache key: {type(value).__name__}')
+
+
+def canonical_key(namespace, data):
+    """Stable hash of a JSON payload, independent of key order, number types and list order"""
+    canonical = json.dumps(_normalize(data), sort_keys=True, separators=(',', ':'))
+    return f'{namespace}:{hashlib.sha256(canonical.encode()).hexdigest()}'
+
+
+class MemoryBackend:
+    """In-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """LRU cache in a local SQLite file so every worker process on the node shares hits"""
+
+    def __init__(self, path, max_entries=1024, ttl=300):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS result_cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_result_cache_accessed_at ON result_cache (accessed_at)')
+
+    def _connect(self):
+        # One connection per thread; sqlite3 connections are not shareable across threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        now = time.time()
+        connection = self._connect()
+        row = connection.execute(
+            'SELECT value, expires_at, accessed_at FROM result_cache WHERE key = ?', (key,)
+        ).fetchone()
+        # Expired rows are left for the next set() to purge
+        if row is None or row[1] < now:
+            return None
+        if now - row[2] >= ACCESS_TIME_RESOLUTION:
+            with connection:
+                connection.execute('UPDATE result_cache SET accessed_at = ? WHERE key = ?', (now, key))
+        return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO result_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, value, now + self.ttl, now)
+            )
+            # Drop expired rows first, then the least recently used ones past the bound
+            evicted = connection.execute('DELETE FROM result_cache WHERE expires_at < ?', (now,)).rowcount
+            evicted += connection.execute(
+                'DELETE FROM result_cache WHERE key IN ('
+                'SELECT key FROM result_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            ).rowcount
+        with self._lock:
+            self.evictions += evicted
+
+    def clear(self):
+        with self._connect() as connection:
+            connection.execute('DELETE FROM result_cache')
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM result_cache').fetchone()[0]
+
+
+class ResultCache:
+    """Hit/miss accounting around a backend"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """Return (value, hit), calling compute() and storing its result on a miss"""
+        value = self.backend.get(key)
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if value is not None:
+            return value, True
+        value = compute()
+        self.backend.set(key, value)
+        return value, False
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend),
+            'max_entries': self.backend.max_entries,
+            'ttl': self.backend.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.backend.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def cache_from_env():
+    """Build the calculation cache from CALCULATION_CACHE_* settings, or None when disabled"""
+    backend = os.environ.get('CALCULATION_CACHE_BACKEND', 'memory')
+    max_entries = int(os.environ.get('CALCULATION_CACHE_SIZE', 1024))
+    ttl = float(os.environ.get('CALCULATION_CACHE_TTL', 300))
+
+    if backend == 'off':
+        return None
+    if backend == 'sqlite':
+        path = os.environ.get('CALCULATION_CACHE_PATH', '/tmp/life_sheet_cache.db')
+        return ResultCache(SQLiteBackend(path, max_entries=max_entries, ttl=ttl))
+    if backend == 'memory':
+        return ResultCache(MemoryBackend(max_entries=max_entries, ttl=ttl))
+    raise ValueError(f'Unknown CALCULATION_CACHE_BACKEND: {backend}')
+
+
+calculation_cache = cache_from_env()
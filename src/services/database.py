@@ -0,0 +1,151 @@
+"""
+Database engine configuration.
+
+DATABASE_URL selects a server database (MySQL through PyMySQL, or
+PostgreSQL) with a pooled engine; without it the app uses its local SQLite
+file. GET traffic can be served from a separate read engine (see
+src/services/routing.py).
+
+SQLite connections get a pragma profile applied on connect. The 'tuned'
+profile switches to WAL so readers no longer block on writers, relaxes fsync
+to once per checkpoint (safe under WAL), waits on locks instead of failing
+immediately, and gives each connection a larger page cache and mmap window.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Scheme aliases used by hosting providers, mapped to the installed drivers
+URL_SCHEMES = {
+    'postgres': 'postgresql',
+    'mysql': 'mysql+pymysql',
+}
+
+POOL_DEFAULTS = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_timeout': 30,
+    # Recycle before MySQL's wait_timeout / load balancer idle cut-offs
+    'pool_recycle': 1800,
+    'pool_pre_ping': True,
+}
+
+# Applied under every profile: SQLite only enforces REFERENCES / ON DELETE CASCADE when asked to
+SQLITE_REQUIRED_PRAGMAS = {
+    'foreign_keys': 'ON',
+}
+
+SQLITE_PRAGMA_PROFILES = {
+    # SQLite's own defaults: rollback journal, fsync on every commit
+    'default': {},
+    'tuned': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,        # ms to wait for a lock before SQLITE_BUSY
+        'cache_size': -20000,        # negative = KiB, i.e. ~20 MB page cache
+        'mmap_size': 268435456,      # 256 MB memory-mapped I/O
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def _normalize_scheme(url):
+    scheme, separator, rest = url.partition('://')
+    return URL_SCHEMES.get(scheme, scheme) + separator + rest
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def database_uri(environ, sqlite_path):
+    """DATABASE_URL with its scheme normalized, or the local SQLite file"""
+    url = environ.get('DATABASE_URL')
+    if not url:
+        return f'sqlite:///{sqlite_path}'
+    return _normalize_scheme(url)
+
+
+def read_database_uri(uri, environ):
+    """
+    URI for the read engine, or None to send everything to the primary.
+
+    DATABASE_READ_URL names a replica. Without one, a SQLite file is opened a
+    second time in read-only mode so reads get their own connection pool.
+    READ_ROUTING=0 turns routing off.
+    """
+    if environ.get('READ_ROUTING', '1') != '1':
+        return None
+    if environ.get('DATABASE_READ_URL'):
+        return _normalize_scheme(environ['DATABASE_READ_URL'])
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and not _is_memory_sqlite(url):
+        return f'sqlite:///file:{url.database}?mode=ro&uri=true'
+    return None
+
+
+def engine_options(uri, environ):
+    """
+    create_engine() keyword arguments for SQLALCHEMY_ENGINE_OPTIONS.
+
+    The QueuePool is sized by DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE and DB_POOL_PRE_PING. In-memory SQLite keeps
+    Flask-SQLAlchemy's single static connection.
+    """
+    if _is_memory_sqlite(make_url(uri)):
+        return {}
+    return {
+        'pool_size': int(environ.get('DB_POOL_SIZE', POOL_DEFAULTS['pool_size'])),
+        'max_overflow': int(environ.get('DB_MAX_OVERFLOW', POOL_DEFAULTS['max_overflow'])),
+        'pool_timeout': int(environ.get('DB_POOL_TIMEOUT', POOL_DEFAULTS['pool_timeout'])),
+        'pool_recycle': int(environ.get('DB_POOL_RECYCLE', POOL_DEFAULTS['pool_recycle'])),
+        'pool_pre_ping': environ.get('DB_POOL_PRE_PING', '1' if POOL_DEFAULTS['pool_pre_ping'] else '0') == '1',
+    }
+
+
+def pool_stats(engine):
+    """Current pool occupancy for monitoring"""
+    pool = engine.pool
+    stats = {'backend': engine.dialect.name, 'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            timeout=pool.timeout(),
+        )
+    return stats
+
+
+def sqlite_pragmas(config):
+    """
+    Pragmas for the app config.
+
+    SQLITE_PRAGMA_PROFILE picks a profile (default 'tuned'); SQLITE_PRAGMAS
+    overrides or adds individual pragmas on top of it.
+    """
+    profile = config.get('SQLITE_PRAGMA_PROFILE', 'tuned')
+    if profile not in SQLITE_PRAGMA_PROFILES:
+        raise ValueError(f'Unknown SQLITE_PRAGMA_PROFILE: {profile}')
+    pragmas = dict(SQLITE_REQUIRED_PRAGMAS, **SQLITE_PRAGMA_PROFILES[profile])
+    pragmas.update(config.get('SQLITE_PRAGMAS') or {})
+    return pragmas
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Apply `pragmas` to every new DBAPI connection of a SQLite engine"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    statements = [f'PRAGMA {name}={value}' for name, value in pragmas.items()]
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
@@ -0,0 +1,124 @@
+"""
+Export of a user's life sheet as CSV or XLSX.
+
+The sheet is a fixed list of sections: profile fields, goals, expenses,
+loans, scenarios, the /calculate totals and the projection rows. Child
+rows are read with yield_per and written as they arrive, so the response
+starts immediately and memory use does not grow with the account size.
+CSV puts the sections one after another, each under a title row; XLSX
+gives every section its own worksheet. Text cells that a spreadsheet would
+read as a formula get a leading apostrophe in the CSV; XLSX stores them as
+plain strings, which are never evaluated.
+"""
+
+import csv
+
+from src.models.user import db
+from src.models.financial import FinancialExpense, FinancialGoal, FinancialLoan, FinancialProfile, FinancialScenario
+from src.services.projection import CALCULATION_DEFAULTS, calculate
+from src.services.xlsx import XLSX_MIMETYPE, stream_workbook
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': XLSX_MIMETYPE,
+}
+
+EXPORT_BATCH_SIZE = 500
+
+# Columns per child table, in to_dict() keys
+SECTION_COLUMNS = (
+    ('Goals', FinancialGoal, ('id', 'order_index', 'description', 'amount', 'target_date', 'priority', 'status',
+                              'created_at', 'updated_at')),
+    ('Expenses', FinancialExpense, ('id', 'order_index', 'description', 'amount', 'expense_type', 'frequency',
+                                    'is_essential', 'created_at', 'updated_at')),
+    ('Loans', FinancialLoan, ('id', 'order_index', 'name', 'amount', 'emi', 'created_at', 'updated_at')),
+    ('Scenarios', FinancialScenario, ('id', 'scenario_name', 'description', 'surplus', 'total_assets',
+                                      'total_liabilities', 'human_capital', 'future_expenses', 'net_worth',
+                                      'asset_growth_rate', 'income_growth_rate', 'expense_growth_rate',
+                                      'created_at', 'updated_at')),
+)
+
+PROJECTION_COLUMNS = ('year', 'age', 'income', 'assets', 'human_capital')
+
+# Leading characters that make spreadsheet applications evaluate a CSV cell
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def export_profile(user_id):
+    """The user's profile, or LookupError"""
+    profile = FinancialProfile.query.filter_by(user_id=user_id).first()
+    if not profile:
+        raise LookupError('Financial profile not found')
+    return profile
+
+
+def _child_rows(model, columns, profile_id):
+    yield columns
+    query = model.query.filter_by(profile_id=profile_id)
+    if hasattr(model, 'order_index'):
+        query = query.order_by(model.order_index, model.id)
+    else:
+        query = query.order_by(model.id)
+    for item in query.yield_per(EXPORT_BATCH_SIZE):
+        values = item.to_dict()
+        yield [values[column] for column in columns]
+
+
+def _calculation(profile):
+    # The stored totals stand in for the individual goal and expense amounts
+    payload = {key: getattr(profile, key) for key in CALCULATION_DEFAULTS if getattr(profile, key) is not None}
+    payload['goals'] = [{'amount': profile.goals_total or 0}]
+    payload['expenses'] = [{'amount': profile.expenses_total or 0}]
+    return calculate(payload)
+
+
+def sheet_sections(profile):
+    """(title, rows) for every section; rows are generators read while the section is written"""
+    profile_values = profile.to_dict(include_children=False)
+    calculation = _calculation(profile)
+
+    sections = [('Profile', [('field', 'value')] + list(profile_values.items()))]
+    sections += [(title, _child_rows(model, columns, profile.id)) for title, model, columns in SECTION_COLUMNS]
+    sections.append(('Calculations', [('field', 'value')] + list(calculation['calculations'].items())))
+    sections.append(('Projections', [PROJECTION_COLUMNS] + [
+        [row[column] for column in PROJECTION_COLUMNS] for row in calculation['projections']
+    ]))
+    return sections
+
+
+def _csv_cell(value):
+    """`value`, with an apostrophe in front if it is text that would be read as a formula"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        try:
+            # Leave numbers such as a negative amount alone
+            float(value)
+        except ValueError:
+            return "'" + value
+    return value
+
+
+class _Echo:
+    """File-like object for csv.writer that hands each formatted row straight back"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(sections):
+    writer = csv.writer(_Echo())
+    # BOM so spreadsheet applications detect UTF-8
+    yield '\ufeff'
+    for number, (title, rows) in enumerate(sections):
+        if number:
+            yield writer.writerow([])
+        yield writer.writerow([title])
+        for row in rows:
+            yield writer.writerow([_csv_cell(value) for value in row])
+
+
+def stream_export(profile, export_format):
+    """Body generator for the requested format ('csv' or 'xlsx')"""
+    sections = sheet_sections(profile)
+    if export_format == 'xlsx':
+        return stream_workbook(sections)
+    return (chunk.encode() for chunk in stream_csv(sections))
@@ -0,0 +1,58 @@
+"""
+Conditional GET support for the per-user financial read endpoints.
+
+Validators come from the user's maintained data version, which is one
+primary key lookup. A matching If-None-Match (or If-Modified-Since) is
+answered with 304 before the view runs, so nothing is loaded or serialized.
+"""
+
+import hashlib
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from src.models.user import db, User
+
+
+def user_data_validators(user_id):
+    """(data_version, data_updated_at) for a user, or None if the user does not exist"""
+    return db.session.query(User.data_version, User.data_updated_at).filter_by(id=user_id).first()
+
+
+def conditional_on_user_data(view):
+    """Add strong ETag / Last-Modified validators to a GET view keyed by user_id"""
+    @wraps(view)
+    def wrapper(user_id, **kwargs):
+        validators = user_data_validators(user_id)
+        if validators is None:
+            # Let the view produce its usual 404
+            return view(user_id, **kwargs)
+
+        version, updated_at = validators
+        # The query string selects the page / format, so it is part of the representation
+        etag = hashlib.sha1(
+            f'{request.endpoint}:{request.query_string.decode()}:{user_id}:{version or 0}'.encode()
+        ).hexdigest()
+
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains_weak(etag)
+        else:
+            not_modified = bool(updated_at and request.if_modified_since
+                                and updated_at.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None))
+
+        if not_modified:
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(view(user_id, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+        if updated_at:
+            response.last_modified = updated_at
+        # Clients may keep the body but must revalidate before using it
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    return wrapper
@@ -0,0 +1,236 @@
+"""
+Shared HTTP client for calls to the OAuth providers.
+
+One requests.Session holds a keep-alive connection pool, so repeated sign-ins
+reuse TCP and TLS connections instead of setting up new ones for the token
+exchange and again for the profile fetch. Every call is bounded by a
+connect and a read timeout. Transient failures are retried a few times
+with jittered exponential backoff: any connection error, timeout or 502/503/504
+for GETs, but only connect timeouts for POSTs and for calls made with
+idempotent=False, since a token exchange that may have reached the provider
+must not be replayed (the code is single use), whatever its HTTP method.
+The session refuses all cookies, so nothing a provider sets for one user is
+sent along with another user's calls.
+
+Each provider has a circuit breaker. After a run of consecutive failures its
+calls fail fast with ProviderUnavailable for a cool-down period, then a
+single trial call decides whether to close it again, so an outage at one
+provider does not tie up workers waiting on timeouts. Latency and outcome
+counts are kept per provider for the health endpoint.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = frozenset((502, 503, 504))
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+# Latency samples kept per provider for the percentiles
+LATENCY_SAMPLES = 512
+
+
+class ProviderUnavailable(RuntimeError):
+    """Raised instead of calling a provider whose circuit breaker is open"""
+
+    def __init__(self, provider, retry_after):
+        super().__init__(f'{provider.capitalize()} sign-in is temporarily unavailable, please retry shortly')
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets one trial call through after `reset_timeout` seconds"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def acquire(self):
+        """Seconds to wait if the call may not go ahead, else 0"""
+        with self._lock:
+            if self.opened_at is None:
+                return 0
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                return remaining
+            if self._trial_running:
+                # Someone else is probing the provider; the others keep failing fast
+                return self.reset_timeout
+            self._trial_running = True
+            return 0
+
+    def record(self, success):
+        with self._lock:
+            self._trial_running = False
+            if success:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                # A failed trial restarts the cool-down
+                self.opened_at = time.monotonic()
+
+
+class ProviderStats:
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+
+    def record(self, elapsed, success):
+        with self._lock:
+            self.calls += 1
+            if not success:
+                self.failures += 1
+            self._latencies.append(elapsed)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def to_dict(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000, 1)
+
+        return {
+            'calls': self.calls,
+            'failures': self.failures,
+            'retries': self.retries,
+            'rejected': self.rejected,
+            'latency_ms': {'p50': percentile(0.50), 'p95': percentile(0.95), 'max': percentile(1.0)},
+        }
+
+
+class ProviderClient:
+    """Pooled session with timeouts, retries and a circuit breaker per provider"""
+
+    def __init__(self, connect_timeout=3.05, read_timeout=10, retries=2, backoff=0.2,
+                 failure_threshold=5, reset_timeout=30, pool_size=10):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.session = requests.Session()
+        # One session serves every user: never keep a cookie from one sign-in for the next
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._breakers = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _provider(self, provider):
+        with self._lock:
+            if provider not in self._breakers:
+                self._breakers[provider] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._stats[provider] = ProviderStats()
+            return self._breakers[provider], self._stats[provider]
+
+    def _retryable(self, idempotent, error=None, response=None):
+        if not idempotent:
+            return isinstance(error, requests.exceptions.ConnectTimeout)
+        if error is not None:
+            return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+        return response.status_code in RETRY_STATUSES
+
+    def request(self, provider, method, url, idempotent=None, **kwargs):
+        """
+        Send a request to `provider`, retrying transient failures.
+
+        `idempotent` defaults to what the HTTP method implies; pass False for
+        a call that must not be replayed once it may have reached the
+        provider. Raises ProviderUnavailable while the provider's breaker is
+        open, and the last requests exception if every attempt fails. A 5xx
+        response that survives the retries is returned to the caller.
+        """
+        breaker, stats = self._provider(provider)
+        kwargs.setdefault('timeout', self.timeout)
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+
+        for attempt in range(self.retries + 1):
+            wait = breaker.acquire()
+            if wait:
+                stats.record_rejected()
+                raise ProviderUnavailable(provider, wait)
+
+            start = time.perf_counter()
+            error = response = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                error = e
+            success = error is None and response.status_code < 500
+            stats.record(time.perf_counter() - start, success)
+            breaker.record(success)
+
+            if success or attempt == self.retries or not self._retryable(idempotent, error, response):
+                if error is not None:
+                    raise error
+                return response
+
+            stats.record_retry()
+            # Full jitter: spread the retries of concurrent callers apart
+            time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    def get(self, provider, url, **kwargs):
+        return self.request(provider, 'GET', url, **kwargs)
+
+    def post(self, provider, url, **kwargs):
+        return self.request(provider, 'POST', url, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            providers = dict(self._stats)
+            breakers = dict(self._breakers)
+        return {
+            provider: dict(stats.to_dict(), breaker=breakers[provider].state)
+            for provider, stats in providers.items()
+        }
+
+
+def provider_client_from_env():
+    """Build the OAuth provider client from OAUTH_HTTP_* settings"""
+    return ProviderClient(
+        connect_timeout=float(os.environ.get('OAUTH_HTTP_CONNECT_TIMEOUT', 3.05)),
+        read_timeout=float(os.environ.get('OAUTH_HTTP_READ_TIMEOUT', 10)),
+        retries=int(os.environ.get('OAUTH_HTTP_RETRIES', 2)),
+        backoff=float(os.environ.get('OAUTH_HTTP_BACKOFF', 0.2)),
+        failure_threshold=int(os.environ.get('OAUTH_BREAKER_FAILURES', 5)),
+        reset_timeout=float(os.environ.get('OAUTH_BREAKER_RESET_SECONDS', 30)),
+        pool_size=int(os.environ.get('OAUTH_HTTP_POOL_SIZE', 10)),
+    )
+
+
+provider_client = provider_client_from_env()
@@ -0,0 +1,114 @@
+"""
+Local verification of OpenID Connect ID tokens against a cached JWKS.
+
+The token endpoint already returns the user's identity as a signed JWT, so
+verifying it here replaces the call to the userinfo endpoint. The
+provider's signing keys are fetched through the shared provider client and
+cached for as long as its Cache-Control allows (JWKS_REFRESH_SECONDS when it
+gives no max-age). A token signed with a key id not in the cache triggers
+one early refresh, at most every JWKS_MIN_REFRESH_SECONDS, so key rotation
+is picked up without letting bogus tokens hammer the provider. If a refresh
+fails, the keys already held keep being used.
+"""
+
+import base64
+import json
+import os
+import re
+import threading
+import time
+
+from authlib.jose import JsonWebKey, JsonWebToken
+from authlib.jose.errors import JoseError
+
+from src.services.http_client import provider_client
+
+JWKS_REFRESH_SECONDS = float(os.environ.get('JWKS_REFRESH_SECONDS', 3600))
+JWKS_MIN_REFRESH_SECONDS = float(os.environ.get('JWKS_MIN_REFRESH_SECONDS', 60))
+# Allowed clock difference with the provider when checking exp / iat
+ID_TOKEN_LEEWAY_SECONDS = 60
+
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+
+class IdTokenError(ValueError):
+    """Raised when an ID token cannot be trusted"""
+
+
+class JwksCache:
+    """A provider's JSON Web Key Set, fetched on first use and refreshed when it expires"""
+
+    def __init__(self, provider, url, client=provider_client):
+        self.provider = provider
+        self.url = url
+        self.client = client
+        self.refreshes = 0
+        self._key_set = None
+        self._kids = frozenset()
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self, now):
+        response = self.client.get(self.provider, self.url)
+        response.raise_for_status()
+        self._key_set = JsonWebKey.import_key_set(response.json())
+        self._kids = frozenset(key.kid for key in self._key_set.keys)
+        max_age = _MAX_AGE.search(response.headers.get('Cache-Control', ''))
+        self._expires_at = now + (int(max_age.group(1)) if max_age else JWKS_REFRESH_SECONDS)
+        self._fetched_at = now
+        self.refreshes += 1
+
+    def get(self, kid=None):
+        """The key set, refreshed first if it has expired or lacks `kid`"""
+        now = time.monotonic()
+        with self._lock:
+            stale = now >= self._expires_at
+            unknown_kid = (kid is not None and kid not in self._kids
+                           and now - self._fetched_at >= JWKS_MIN_REFRESH_SECONDS)
+            if self._key_set is None or stale or unknown_kid:
+                try:
+                    self._refresh(now)
+                except Exception:
+                    if self._key_set is None:
+                        raise
+                    # Keep serving the keys we have; try again after the minimum interval
+                    self._fetched_at = now
+                    self._expires_at = now + JWKS_MIN_REFRESH_SECONDS
+            return self._key_set
+
+
+def _token_header(token):
+    try:
+        segment = token.split('.')[0]
+        header = json.loads(base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4)))
+    except (ValueError, AttributeError):
+        header = None
+    if not isinstance(header, dict):
+        raise IdTokenError('Malformed ID token')
+    return header
+
+
+def verify_id_token(token, jwks, audience, issuers, algorithms=('RS256',), now=None):
+    """
+    Check an ID token's signature, issuer, audience and lifetime; return its claims.
+
+    Raises IdTokenError if any check fails.
+    """
+    header = _token_header(token)
+    if header.get('alg') not in algorithms:
+        raise IdTokenError('Unexpected ID token algorithm')
+
+    key_set = jwks.get(header.get('kid'))
+    try:
+        claims = JsonWebToken(list(algorithms)).decode(token, key_set, claims_options={
+            'iss': {'essential': True, 'values': list(issuers)},
+            'aud': {'essential': True, 'value': audience},
+            'sub': {'essential': True},
+            'exp': {'essential': True},
+        })
+        claims.validate(now=now, leeway=ID_TOKEN_LEEWAY_SECONDS)
+    except (JoseError, ValueError) as e:
+        # ValueError: authlib's "no key with this kid"
+        raise IdTokenError(f'Invalid ID token: {e}')
+    return dict(claims)
@@ -0,0 +1,232 @@
+"""
+Bulk import of goals, expenses and loans from an uploaded CSV or XLSX sheet.
+
+The file is parsed incrementally, one row at a time, so memory use does not
+depend on its length. The header row is mapped onto the model fields (other
+columns, such as those an export adds, are ignored) and rows are validated
+with the same rules as the bulk endpoint. Valid rows are inserted in chunks
+with executemany, each chunk taking its order indexes from one atomic
+counter update. The whole import is one transaction: by default any invalid
+row rolls it back, or with skip_invalid the valid rows are kept.
+"""
+
+import csv
+import io
+import re
+import tempfile
+from datetime import date, datetime, timedelta
+
+from src.models.user import db, bump_data_version
+from src.models.financial import AGGREGATED_COLUMNS, FinancialProfile, apply_aggregate_deltas
+from src.services.bulk import BULK_RESOURCES, aggregate_values, clean_fields
+from src.services.ordering import allocate_order_indexes
+from src.services.xlsx import XLSX_MIMETYPE, iter_sheet_rows
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_IMPORT_ROWS = 100000
+# Widest sheet accepted; far more than the few mapped fields and any export extras
+MAX_IMPORT_COLUMNS = 256
+# Row errors listed in the response; the total count is always reported
+MAX_REPORTED_ERRORS = 100
+SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+
+# Alternative header names accepted per field
+HEADER_ALIASES = {
+    'description': ('name', 'title', 'goal', 'expense'),
+    'name': ('description', 'title', 'loan'),
+    'amount': ('value', 'cost'),
+    'emi': ('monthly_emi', 'installment'),
+    'target_date': ('date', 'due_date'),
+    'expense_type': ('type', 'category'),
+    'is_essential': ('essential',),
+}
+
+TRUE_VALUES = {'true', 'yes', 'y', '1'}
+FALSE_VALUES = {'false', 'no', 'n', '0'}
+
+# Day 0 of Excel's 1900 date system, with its fictitious 29 Feb 1900 accounted for
+EXCEL_EPOCH = date(1899, 12, 30)
+
+
+class ImportValidationError(ValueError):
+    """Raised with row-level errors when an import is rejected"""
+
+    def __init__(self, errors, error_count):
+        super().__init__('Validation failed')
+        self.errors = errors
+        self.error_count = error_count
+
+
+def _header_key(header):
+    return re.sub(r'[^a-z0-9]+', '_', str(header or '').strip().lower()).strip('_')
+
+
+def column_mapping(resource, header):
+    """{column position: field} for the header cells that name a known field"""
+    keys = [_header_key(cell) for cell in header]
+    mapping = {}
+    for field in resource['fields']:
+        for name in (field,) + HEADER_ALIASES.get(field, ()):
+            if name in keys and keys.index(name) not in mapping:
+                mapping[keys.index(name)] = field
+                break
+    missing = [field for field in resource['required'] if field not in mapping.values()]
+    if missing:
+        raise ValueError(f'Missing required column: {", ".join(missing)}')
+    return mapping
+
+
+def _convert(field, value):
+    """A cell (CSV text or XLSX value) as the JSON-style value the bulk validation expects"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if value == '':
+            return None
+    if field in ('amount', 'emi'):
+        if isinstance(value, str):
+            try:
+                return float(value.replace(',', ''))
+            except ValueError:
+                raise ValueError(f'Invalid numeric value for {field}')
+        return value
+    if field == 'is_essential':
+        if isinstance(value, str):
+            if value.lower() in TRUE_VALUES:
+                return True
+            if value.lower() in FALSE_VALUES:
+                return False
+            raise ValueError('Invalid boolean value for is_essential')
+        return bool(value)
+    if field == 'target_date':
+        if isinstance(value, bool):
+            raise ValueError('Invalid target_date: expected YYYY-MM-DD')
+        if isinstance(value, (int, float)):
+            try:
+                return (EXCEL_EPOCH + timedelta(days=int(value))).isoformat()
+            except (OverflowError, ValueError):
+                # Past date.max, or NaN / infinity
+                raise ValueError('Invalid target_date: serial date out of range')
+        try:
+            return datetime.fromisoformat(value).date().isoformat()
+        except ValueError:
+            raise ValueError('Invalid target_date: expected YYYY-MM-DD')
+    return value if isinstance(value, str) else str(value)
+
+
+def _csv_rows(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    for line_number, values in enumerate(csv.reader(text), start=1):
+        yield line_number, values
+
+
+def sheet_rows(stream, filename, mimetype, sheet):
+    """
+    Yield (row number, values) from an uploaded file.
+
+    XLSX is detected by extension, mimetype or zip signature. Sniffing the
+    signature and reading a zip both need a seekable file, so a raw request
+    body is first spooled to a temporary file (kept in memory up to
+    SPOOL_MEMORY_BYTES). Anything else is read as UTF-8 CSV.
+    """
+    if not stream.seekable():
+        spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+        while chunk := stream.read(64 * 1024):
+            spooled.write(chunk)
+        spooled.seek(0)
+        stream = spooled
+
+    is_xlsx = (filename or '').lower().endswith('.xlsx') or mimetype == XLSX_MIMETYPE
+    if not is_xlsx:
+        is_xlsx = stream.read(4) == b'PK\x03\x04'
+        stream.seek(0)
+    if is_xlsx:
+        return iter_sheet_rows(stream, sheet, max_columns=MAX_IMPORT_COLUMNS)
+    return _csv_rows(stream)
+
+
+def import_rows(kind, user_id, profile_id, rows, skip_invalid=False):
+    """
+    Validate and insert the rows of one sheet into a profile's goals, expenses or loans.
+
+    `rows` yields (row number, values) with the header first; blank rows
+    are skipped. Returns {'imported', 'skipped', 'errors'}. Raises
+    ImportValidationError (unless skip_invalid) with the row errors,
+    LookupError if the profile does not exist and ValueError for an
+    unusable header.
+    """
+    resource = BULK_RESOURCES[kind]
+    model = resource['model']
+
+    profile = FinancialProfile.query.get(profile_id)
+    if not profile:
+        raise LookupError('Financial profile not found')
+    if profile.user_id != user_id:
+        raise ValueError('Profile does not belong to this user')
+
+    rows = iter(rows)
+    header = next((values for _, values in rows if any(value not in (None, '') for value in values)), None)
+    if header is None:
+        raise ValueError('The file has no header row')
+    mapping = column_mapping(resource, header)
+
+    now = datetime.utcnow()
+    deltas = {total: 0 for _, total in AGGREGATED_COLUMNS[model]}
+    errors, error_count, imported, seen = [], 0, 0, 0
+    chunk = []
+
+    def insert(chunk):
+        for order_index, values in zip(allocate_order_indexes(model, profile.id, len(chunk)), chunk):
+            values.update(user_id=profile.user_id, profile_id=profile.id, order_index=order_index,
+                          created_at=now, updated_at=now)
+            for total, value in aggregate_values(model, values).items():
+                deltas[total] += value
+        db.session.execute(db.insert(model), chunk)
+
+    for row_number, values in rows:
+        if not any(value not in (None, '') for value in values):
+            continue
+        seen += 1
+        if seen > MAX_IMPORT_ROWS:
+            db.session.rollback()
+            raise ValueError(f'An import may contain at most {MAX_IMPORT_ROWS} rows')
+
+        try:
+            item = {}
+            for position, field in mapping.items():
+                value = _convert(field, values[position] if position < len(values) else None)
+                if value is not None:
+                    item[field] = value
+            row = dict(resource['defaults'])
+            row.update(clean_fields(resource, item, required=True))
+        except ValueError as e:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'row': row_number, 'error': str(e)})
+            continue
+
+        # Once the import is known to fail there is nothing left to insert
+        if error_count and not skip_invalid:
+            continue
+        chunk.append(row)
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            insert(chunk)
+            imported += len(chunk)
+            chunk = []
+
+    if error_count and not skip_invalid:
+        db.session.rollback()
+        raise ImportValidationError(errors, error_count)
+
+    if chunk:
+        insert(chunk)
+        imported += len(chunk)
+
+    if imported:
+        connection = db.session.connection()
+        apply_aggregate_deltas(connection, profile.id, deltas)
+        bump_data_version(connection, profile.user_id)
+    db.session.commit()
+
+    return {'imported': imported, 'skipped': error_count, 'errors': errors}
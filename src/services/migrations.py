@@ -0,0 +1,152 @@
+"""
+Versioned schema migrations.
+
+Migrations live in src/migrations as NNNN_description.py files, each with an
+`upgrade(connection)` function, and run in version order. Applied versions
+are recorded in the schema_version table, so app startup only has to read
+the highest version to know whether anything is pending.
+
+Migrations must be idempotent: databases created before this runner already
+carry some of the columns they add. A migration that rebuilds SQLite tables
+sets DISABLE_FOREIGN_KEYS = True, so dropping a parent table does not
+cascade into its children while the replacement is put in place.
+"""
+
+import importlib.util
+import os
+import re
+from datetime import datetime
+
+from sqlalchemy.exc import DBAPIError
+
+from src.models.user import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+schema_version = db.Table(
+    'schema_version',
+    db.MetaData(),
+    db.Column('version', db.Integer, primary_key=True, autoincrement=False),
+    db.Column('name', db.String(255), nullable=False),
+    db.Column('applied_at', db.DateTime, nullable=False),
+)
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    """All migration modules as (version, name, module), in version order"""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        version, name = int(match.group(1)), match.group(2)
+        spec = importlib.util.spec_from_file_location(f'src.migrations.m{filename[:-3]}', os.path.join(directory, filename))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        migrations.append((version, name, module))
+
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError('Duplicate migration versions in ' + directory)
+    return migrations
+
+
+def current_version(connection):
+    """Highest applied version; 0 for a database the runner has never touched"""
+    try:
+        return connection.execute(db.select(db.func.max(schema_version.c.version))).scalar() or 0
+    except DBAPIError:
+        # No schema_version table yet
+        connection.rollback()
+        return 0
+
+
+def latest_version():
+    migrations = discover_migrations()
+    return migrations[-1][0] if migrations else 0
+
+
+def upgrade(engine, target=None, log=print):
+    """
+    Apply pending migrations up to `target` (default: latest).
+
+    Each migration runs in its own transaction together with its
+    schema_version row. Returns the versions applied by this call.
+    """
+    with engine.begin() as connection:
+        schema_version.create(connection, checkfirst=True)
+
+    applied = []
+    for version, name, module in discover_migrations():
+        if target is not None and version > target:
+            break
+        with engine.connect() as connection:
+            # PRAGMA foreign_keys is ignored inside a transaction, so toggle it around one
+            foreign_keys_off = getattr(module, 'DISABLE_FOREIGN_KEYS', False) and engine.dialect.name == 'sqlite'
+            if foreign_keys_off:
+                connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+                connection.commit()
+            try:
+                with connection.begin():
+                    # Re-read inside the transaction: another worker may have got here first
+                    if version <= current_version(connection):
+                        continue
+                    log(f"Applying migration {version:04d}_{name}")
+                    module.upgrade(connection)
+                    connection.execute(
+                        schema_version.insert().values(version=version, name=name, applied_at=datetime.utcnow())
+                    )
+            finally:
+                if foreign_keys_off:
+                    connection.exec_driver_sql('PRAGMA foreign_keys=ON')
+                    connection.commit()
+        applied.append(version)
+    return applied
+
+
+def status(engine):
+    """(version, name, applied) for every known migration"""
+    with engine.connect() as connection:
+        version = current_version(connection)
+    return [(number, name, number <= version) for number, name, _ in discover_migrations()]
+
+
+def startup_check(engine, auto_migrate, log=print):
+    """
+    Run on app boot: one version read, and an upgrade only if something is pending.
+
+    A worker that loses the race to another worker's upgrade re-checks the
+    version instead of failing.
+    """
+    with engine.connect() as connection:
+        version = current_version(connection)
+    latest = latest_version()
+    if version >= latest:
+        return
+
+    if not auto_migrate:
+        log(f"Database schema is at version {version}, latest is {latest}; run 'flask migrate'")
+        return
+
+    try:
+        upgrade(engine, log=log)
+    except DBAPIError:
+        with engine.connect() as connection:
+            if current_version(connection) < latest:
+                raise
+
+
+# Helpers for migration modules
+
+def column_names(connection, table):
+    return {column['name'] for column in db.inspect(connection).get_columns(table)}
+
+
+def add_column_if_missing(connection, table, column, column_type):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists"""
+    if column in column_names(connection, table):
+        return False
+    quoted = connection.dialect.identifier_preparer.quote(table)
+    connection.execute(db.text(f'ALTER TABLE {quoted} ADD COLUMN {column} {column_type}'))
+    return True
@@ -0,0 +1,168 @@
+"""
+Sparse order_index allocation and reordering for goals, expenses and loans.
+
+New rows take their order_index from a per-profile counter that is advanced
+with a single atomic UPDATE, so concurrent inserts never share an index.
+Indexes are spaced ORDER_GAP apart, which lets a move take the midpoint
+between its new neighbours and touch only the moved row. When two neighbours
+have no room left between them the profile's list is renumbered.
+"""
+
+from src.models.user import db, bump_data_version
+from src.models.financial import FinancialExpense, FinancialGoal, FinancialLoan, FinancialProfile
+
+ORDER_GAP = 1024
+
+ORDERED_MODELS = {
+    'goals': FinancialGoal,
+    'expenses': FinancialExpense,
+    'loans': FinancialLoan,
+}
+
+
+def allocate_order_indexes(model, profile_id, count=1):
+    """
+    Reserve `count` order indexes at the end of a profile's list.
+
+    The counter never falls behind rows written without it: the UPDATE takes
+    the larger of the counter and the current max(order_index).
+    """
+    table = FinancialProfile.__table__
+    current = db.func.coalesce(table.c.order_counter, 0)
+    highest = (
+        db.select(db.func.coalesce(db.func.max(model.order_index), 0))
+        .where(model.profile_id == profile_id)
+        .scalar_subquery()
+    )
+    result = db.session.execute(
+        table.update()
+        .where(table.c.id == profile_id)
+        .values(order_counter=db.case((current >= highest, current), else_=highest) + count * ORDER_GAP)
+    )
+    if not result.rowcount:
+        raise LookupError('Financial profile not found')
+
+    last = db.session.execute(db.select(table.c.order_counter).where(table.c.id == profile_id)).scalar()
+    first = last - (count - 1) * ORDER_GAP
+    return [first + offset * ORDER_GAP for offset in range(count)]
+
+
+def rebalance(model, profile_id):
+    """Renumber a profile's list ORDER_GAP apart, keeping its current order"""
+    rows = db.session.execute(
+        db.select(model.id).where(model.profile_id == profile_id).order_by(model.order_index, model.id)
+    ).scalars().all()
+    if rows:
+        db.session.execute(
+            db.update(model),
+            [{'id': row_id, 'order_index': (position + 1) * ORDER_GAP} for position, row_id in enumerate(rows)]
+        )
+    return len(rows)
+
+
+def rebalance_crowded(min_gap=2):
+    """
+    Renumber every list whose tightest gap has dropped below `min_gap`.
+
+    Meant to run periodically (flask rebalance-order) so moves rarely hit a
+    full gap during a request. Returns the number of lists renumbered.
+    """
+    renumbered = 0
+    for model in ORDERED_MODELS.values():
+        crowded = set()
+        previous_profile, previous_index = None, None
+        rows = db.session.execute(
+            db.select(model.profile_id, model.order_index).order_by(model.profile_id, model.order_index)
+        )
+        for profile_id, order_index in rows:
+            if profile_id == previous_profile and order_index - previous_index < min_gap:
+                crowded.add(profile_id)
+            previous_profile, previous_index = profile_id, order_index
+        for profile_id in crowded:
+            rebalance(model, profile_id)
+        renumbered += len(crowded)
+    db.session.commit()
+    return renumbered
+
+
+def _new_index(ordering, position):
+    """Index strictly between the neighbours around `position`, or None if there is no room"""
+    previous = ordering[position - 1][1] if position > 0 else 0
+    if position == len(ordering):
+        return previous + ORDER_GAP
+    following = ordering[position][1]
+    if following - previous < 2:
+        return None
+    return (previous + following) // 2
+
+
+def reorder(kind, data, user_id):
+    """
+    Apply a list of moves to one of `user_id`'s profiles' goals, expenses or loans.
+
+    Each move is {'id': X, 'after_id': Y}; after_id null moves the item to
+    the front. Returns the resulting [{'id', 'order_index'}] in order.
+    Raises LookupError if the profile is not the user's or a move names an
+    item that is not in it.
+    """
+    model = ORDERED_MODELS[kind]
+    if not isinstance(data, dict) or 'profile_id' not in data:
+        raise ValueError('Missing required field: profile_id')
+    moves = data.get('moves')
+    if not isinstance(moves, list) or not moves:
+        raise ValueError('moves must be a non-empty list')
+
+    profile = FinancialProfile.query.get(data['profile_id'])
+    # Someone else's profile is reported exactly like a missing one
+    if not profile or profile.user_id != user_id:
+        raise LookupError('Financial profile not found')
+
+    ordering = [
+        list(row) for row in db.session.execute(
+            db.select(model.id, model.order_index)
+            .where(model.profile_id == profile.id, model.user_id == user_id)
+            .order_by(model.order_index, model.id)
+        )
+    ]
+    ids = {row[0] for row in ordering}
+    for index, move in enumerate(moves):
+        if not isinstance(move, dict):
+            raise ValueError(f'Move {index}: expected an object')
+        if move.get('id') not in ids:
+            raise LookupError(f'Move {index}: {model.__name__} not found')
+        if move.get('after_id') is not None and move['after_id'] not in ids:
+            raise LookupError(f'Move {index}: after_id not found')
+        if move.get('after_id') == move['id']:
+            raise ValueError(f'Move {index}: an item cannot follow itself')
+
+    changed = {}
+    for move in moves:
+        entry = next(row for row in ordering if row[0] == move['id'])
+        ordering.remove(entry)
+        after_id = move.get('after_id')
+        position = 0 if after_id is None else next(i for i, row in enumerate(ordering) if row[0] == after_id) + 1
+
+        new_index = _new_index(ordering, position)
+        if new_index is None:
+            # Neighbours are adjacent integers: renumber the whole list with the item in place
+            ordering.insert(position, entry)
+            for rank, row in enumerate(ordering):
+                row[1] = (rank + 1) * ORDER_GAP
+                changed[row[0]] = row[1]
+            continue
+
+        entry[1] = new_index
+        ordering.insert(position, entry)
+        changed[entry[0]] = new_index
+
+    # Scoped again in the UPDATE itself, so an id can only ever touch this profile's rows
+    db.session.execute(
+        db.update(model).where(model.profile_id == profile.id, model.user_id == user_id),
+        [{'id': row_id, 'order_index': index} for row_id, index in changed.items()],
+        # The commit below expires anything loaded, so there is nothing to synchronize
+        execution_options={'synchronize_session': None}
+    )
+    bump_data_version(db.session.connection(), profile.user_id)
+    db.session.commit()
+
+    return [{'id': row_id, 'order_index': index} for row_id, index in ordering]
@@ -0,0 +1,85 @@
+"""
+Keyset pagination and NDJSON streaming for list endpoints.
+
+Pages are addressed by an opaque cursor holding the sort key of the last row
+returned, so fetching page N costs the same as page 1. Without `limit` or
+`cursor` the endpoints keep returning the full list as before.
+"""
+
+import base64
+import binascii
+import json
+
+from flask import Response, jsonify, request, stream_with_context
+
+from src.models.user import db
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 500
+
+
+def encode_cursor(values):
+    """Opaque, URL-safe cursor for a sort key"""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Sort key from a cursor; raises ValueError if it was not produced by encode_cursor"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def page_size(args):
+    """The `limit` query parameter, or None when the client wants the whole list"""
+    limit = args.get('limit')
+    if limit is None:
+        return None
+    if not limit.isdigit() or not 1 <= int(limit) <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be an integer between 1 and {MAX_PAGE_SIZE}')
+    return int(limit)
+
+
+def ndjson_rows(query, serialize):
+    """Yield one JSON line per row, fetching from the cursor in fixed-size batches"""
+    for item in query.yield_per(STREAM_BATCH_SIZE):
+        yield json.dumps(serialize(item)) + '\n'
+
+
+def list_response(query, key_columns, collection, serialize=lambda item: item.to_dict(), bare_list=False):
+    """
+    Serve a list query as a full list, a keyset page or an NDJSON stream.
+
+    `key_columns` must form a unique sort key, e.g. (order_index, id).
+    ?stream=ndjson streams every row; ?limit=N[&cursor=...] returns one page
+    plus a `next` cursor (None on the last page).
+    """
+    query = query.order_by(*key_columns)
+
+    if request.args.get('stream') == 'ndjson':
+        return Response(stream_with_context(ndjson_rows(query, serialize)), mimetype=NDJSON_MIMETYPE)
+
+    limit = page_size(request.args)
+    cursor = request.args.get('cursor')
+    if limit is None and cursor is None:
+        items = [serialize(item) for item in query]
+        return jsonify(items) if bare_list else jsonify({collection: items})
+
+    limit = limit or MAX_PAGE_SIZE
+    if cursor:
+        query = query.filter(db.tuple_(*key_columns) > tuple(decode_cursor(cursor, len(key_columns))))
+
+    # Fetch one extra row to learn whether another page follows
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column in key_columns])
+
+    return jsonify({collection: [serialize(item) for item in rows], 'next': next_cursor})
@@ -0,0 +1,145 @@
+"""
+Password hashing on a bounded worker pool.
+
+Hashing and verifying a password is deliberately slow (tens of
+milliseconds of CPU, and ~32 MB of memory for scrypt). Doing it inline lets
+a burst of logins occupy every request worker and every core at once. Here
+the work runs on a fixed pool (threads by default: hashlib releases the GIL
+while hashing; processes if PASSWORD_HASH_EXECUTOR=process) with a bounded
+number of waiting jobs, so at most PASSWORD_HASH_WORKERS hashes run
+concurrently and requests beyond the queue depth are turned away at once
+with PasswordHashingBusy (a 503 with Retry-After) instead of piling up.
+
+The work factor is chosen by profile. Hashes record the method they were
+made with, so those made under an older profile are detected by
+needs_rehash and upgraded on the next successful login.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Work-factor profiles, as werkzeug method strings
+PASSWORD_HASH_PROFILES = {
+    'default': 'scrypt:32768:8:1',
+    'strong': 'scrypt:65536:8:1',
+    'pbkdf2': 'pbkdf2:sha256:1000000',
+    # Development and benchmarks only
+    'fast': 'pbkdf2:sha256:10000',
+}
+
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+# Jobs allowed to wait for a worker before new ones are rejected
+PASSWORD_HASH_QUEUE_DEPTH = int(os.environ.get('PASSWORD_HASH_QUEUE_DEPTH', 4 * PASSWORD_HASH_WORKERS))
+PASSWORD_HASH_EXECUTOR = os.environ.get('PASSWORD_HASH_EXECUTOR', 'thread')
+# Seconds a rejected client is told to wait
+PASSWORD_HASH_RETRY_AFTER = 1
+
+# Stored instead of a hash for accounts that sign in through OAuth only
+OAUTH_PASSWORD_HASH = 'oauth_user'
+
+
+class PasswordHashingBusy(RuntimeError):
+    """Raised when the hashing queue is full"""
+
+    retry_after = PASSWORD_HASH_RETRY_AFTER
+
+    def __init__(self):
+        super().__init__('Too many concurrent sign-ins, please retry shortly')
+
+
+def hash_method(environ):
+    """The werkzeug method for PASSWORD_HASH_METHOD, or else the PASSWORD_HASH_PROFILE profile"""
+    if environ.get('PASSWORD_HASH_METHOD'):
+        return environ['PASSWORD_HASH_METHOD']
+    profile = environ.get('PASSWORD_HASH_PROFILE', 'default')
+    if profile not in PASSWORD_HASH_PROFILES:
+        raise ValueError(f'PASSWORD_HASH_PROFILE must be one of: {", ".join(PASSWORD_HASH_PROFILES)}')
+    return PASSWORD_HASH_PROFILES[profile]
+
+
+class PasswordHasher:
+    """
+    Hash and verify passwords on a pool of `workers` with at most `queue_depth` jobs waiting.
+
+    With no workers, hashing runs inline on the calling thread.
+    """
+
+    def __init__(self, method, workers=PASSWORD_HASH_WORKERS, queue_depth=PASSWORD_HASH_QUEUE_DEPTH,
+                 executor=PASSWORD_HASH_EXECUTOR):
+        if executor not in ('thread', 'process'):
+            raise ValueError("PASSWORD_HASH_EXECUTOR must be 'thread' or 'process'")
+        self.method = method
+        # What werkzeug writes in front of the salt, with its defaults filled in ('scrypt' -> 'scrypt:32768:8:1');
+        # hashing once also rejects an unknown method at startup rather than at the first sign-up
+        self.prefix = generate_password_hash('', method).split('$', 1)[0]
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.executor = executor
+        self.in_flight = 0
+        self.rejected = 0
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        """The worker pool, created on first use (after any fork of the web server); call with the lock held"""
+        if self._pool is None:
+            if self.executor == 'process':
+                # Started from a fresh server process, not forked from this multithreaded one
+                start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(start_method)
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        return self._pool
+
+    def _run(self, function, *args):
+        if not self.workers:
+            return function(*args)
+        with self._lock:
+            if self.in_flight >= self.workers + self.queue_depth:
+                self.rejected += 1
+                raise PasswordHashingBusy()
+            self.in_flight += 1
+            try:
+                future = self._get_pool().submit(function, *args)
+            except BaseException:
+                self.in_flight -= 1
+                raise
+        future.add_done_callback(self._finished)
+        return future.result()
+
+    def _finished(self, future):
+        with self._lock:
+            self.in_flight -= 1
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        if not password_hash or password_hash == OAUTH_PASSWORD_HASH:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Whether a hash was made with another method or work factor than the current one"""
+        if not password_hash or password_hash == OAUTH_PASSWORD_HASH:
+            return False
+        return password_hash.split('$', 1)[0] != self.prefix
+
+    def stats(self):
+        return {
+            'method': self.method,
+            'executor': self.executor,
+            'workers': self.workers,
+            'queue_depth': self.queue_depth,
+            'in_flight': self.in_flight,
+            'rejected': self.rejected,
+        }
+
+
+hasher = PasswordHasher(hash_method(os.environ))
@@ -0,0 +1,217 @@
+"""
+Vectorized projection engine for the life sheet calculations.
+
+Every function broadcasts over its inputs, so the same code path serves a
+single profile (scalars) and many profiles at once (1-D arrays). Year-by-year
+series are built as whole vectors instead of one `**` call per year.
+"""
+
+import numpy as np
+
+# Base year and retirement age from the Excel analysis
+BASE_YEAR = 2025
+RETIREMENT_AGE = 65
+
+# Guard against absurd lifespans blowing up the projection matrix
+MAX_HORIZON_YEARS = 150
+
+# Inputs read by /calculate and the defaults it applies when they are missing
+CALCULATION_DEFAULTS = {
+    'age': 30,
+    'current_annual_gross_income': 0,
+    'work_tenure_years': 0,
+    'total_asset_gross_market_value': 0,
+    'total_loan_outstanding_value': 0,
+    'income_growth_rate': 0.06,  # 6% inflation
+    'asset_growth_rate': 0.06,   # 6% inflation
+    'lifespan_years': 85,
+}
+
+# Profiles evaluated per vectorized pass in batch mode
+BATCH_CHUNK_SIZE = 1000
+
+
+def calculation_inputs(data):
+    """Read a /calculate payload into plain numbers, summing the dynamic expense and goal entries"""
+    if not isinstance(data, dict):
+        raise ValueError('Calculation input must be a JSON object')
+
+    inputs = {key: data.get(key, default) for key, default in CALCULATION_DEFAULTS.items()}
+    inputs['annual_expenses'] = sum(expense.get('amount', 0) for expense in data.get('expenses') or [])
+    inputs['financial_goals'] = sum(goal.get('amount', 0) for goal in data.get('goals') or [])
+
+    for key, value in inputs.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f'Invalid numeric value for {key}')
+    return inputs
+
+
+def working_years(age, work_tenure_years, retirement_age=RETIREMENT_AGE):
+    """Number of earning years left, bounded by tenure and retirement age"""
+    return np.maximum(0, np.minimum(work_tenure_years, retirement_age - age))
+
+
+def projection_span(age, work_tenure_years, lifespan_years):
+    """Index of the last projected year (earning years or remaining life, whichever is longer)"""
+    span = np.maximum(working_years(age, work_tenure_years), np.subtract(lifespan_years, age))
+    return np.minimum(np.maximum(span, 0), MAX_HORIZON_YEARS - 1).astype(np.int64)
+
+
+def compound(rate, horizon):
+    """Cumulative growth factors (1 + rate) ** t for t in [0, horizon), one row per rate"""
+    years = np.arange(horizon)
+    return np.power(1 + np.asarray(rate, dtype=float)[..., None], years)
+
+
+def cumulative_growth(rates):
+    """Growth factors for per-year rates along the last axis: year t holds prod(1 + rates[:t])"""
+    rates = np.asarray(rates, dtype=float)
+    factors = np.ones_like(rates)
+    np.cumprod(1 + rates[..., :-1], axis=-1, out=factors[..., 1:])
+    return factors
+
+
+def remaining_earning_years(employed):
+    """Tail sum of the employment mask: earning years left from each year onwards"""
+    return np.cumsum(employed[..., ::-1], axis=-1)[..., ::-1]
+
+
+def project(age, current_annual_gross_income, work_tenure_years, total_asset_gross_market_value,
+            income_growth_rate, asset_growth_rate, lifespan_years, horizon=None):
+    """
+    Build the projection series for one or many profiles in a single pass.
+
+    Returns a dict of arrays shaped (..., horizon). Each profile's rows run
+    from year 0 to its own 'span'; ragged batches share one padded matrix.
+    """
+    age = np.asarray(age, dtype=np.int64)
+    working = working_years(age, work_tenure_years)
+    span = projection_span(age, work_tenure_years, lifespan_years)
+
+    if horizon is None:
+        horizon = int(span.max()) + 1
+    years = np.arange(horizon)
+
+    employed = years < working[..., None]
+    income = np.asarray(current_annual_gross_income, dtype=float)[..., None] * compound(income_growth_rate, horizon)
+    income *= employed
+    # Human capital stays the Excel "income x remaining years" figure, evaluated per year
+    human_capital = income * remaining_earning_years(employed)
+    assets = np.asarray(total_asset_gross_market_value, dtype=float)[..., None] * compound(asset_growth_rate, horizon)
+
+    return {
+        'age': age,
+        'span': span,
+        'income': income,
+        'assets': assets,
+        'human_capital': human_capital,
+    }
+
+
+def projection_rows(table, index=()):
+    """Convert one profile's projection series into the JSON rows used by the chart"""
+    age = int(table['age'][index])
+    length = int(table['span'][index]) + 1
+    amounts = np.stack([table['income'][index], table['assets'][index], table['human_capital'][index]])
+    amounts = np.rint(amounts[:, :length]).astype(np.int64).T.tolist()
+    return [
+        {'year': BASE_YEAR + year, 'age': age + year, 'income': income, 'assets': assets, 'human_capital': human_capital}
+        for year, (income, assets, human_capital) in enumerate(amounts)
+    ]
+
+
+def calculate_totals(age, current_annual_gross_income, work_tenure_years, total_asset_gross_market_value,
+                     total_loan_outstanding_value, lifespan_years, annual_expenses, financial_goals):
+    """
+    Surplus/deficit totals based on the Excel logic.
+
+    `annual_expenses` and `financial_goals` are the summed amounts of the
+    dynamic expense and goal entries.
+    """
+    total_human_capital = np.multiply(current_annual_gross_income, work_tenure_years)
+    total_existing_assets = np.asarray(total_asset_gross_market_value, dtype=float)
+    total_existing_liabilities = np.asarray(total_loan_outstanding_value, dtype=float)
+    remaining_life_years = np.maximum(0, np.subtract(lifespan_years, age))
+    total_future_expenses = np.multiply(annual_expenses, remaining_life_years)
+
+    total_assets = total_existing_assets + total_human_capital
+    total_liabilities = total_existing_liabilities + total_future_expenses + financial_goals
+
+    return {
+        'total_existing_assets': total_existing_assets,
+        'total_human_capital': total_human_capital,
+        'total_existing_liabilities': total_existing_liabilities,
+        'total_future_expenses': total_future_expenses,
+        'total_financial_goals': np.asarray(financial_goals, dtype=float),
+        'current_networth': total_existing_assets - total_existing_liabilities,
+        'surplus_deficit': total_assets - total_liabilities,
+    }
+
+
+def round_totals(totals, index=()):
+    """Round one profile's totals to whole currency units for the response"""
+    return {key: int(np.rint(np.asarray(value)[index])) for key, value in totals.items()}
+
+
+def totals_rows(totals):
+    """Round a batch of totals in one pass and split it into per-profile dicts"""
+    columns = {key: np.rint(value).astype(np.int64).tolist() for key, value in totals.items()}
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def evaluate(inputs):
+    """Run the totals and projection series for scalar or columnar inputs"""
+    totals = calculate_totals(
+        inputs['age'], inputs['current_annual_gross_income'], inputs['work_tenure_years'],
+        inputs['total_asset_gross_market_value'], inputs['total_loan_outstanding_value'],
+        inputs['lifespan_years'], inputs['annual_expenses'], inputs['financial_goals']
+    )
+    table = project(
+        inputs['age'], inputs['current_annual_gross_income'], inputs['work_tenure_years'],
+        inputs['total_asset_gross_market_value'], inputs['income_growth_rate'],
+        inputs['asset_growth_rate'], inputs['lifespan_years']
+    )
+    return totals, table
+
+
+def calculate(data):
+    """Full /calculate response body for a single payload"""
+    totals, table = evaluate(calculation_inputs(data))
+    return {'calculations': round_totals(totals), 'projections': projection_rows(table)}
+
+
+def calculate_batch(payloads, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Evaluate an iterable of /calculate payloads, yielding results in input order.
+
+    Payloads are gathered into columnar arrays and evaluated one chunk at a
+    time, so results start flowing before the whole input has been read.
+    Invalid payloads yield an {'error': ...} entry in their position.
+    """
+    chunk = []
+    for payload in payloads:
+        chunk.append(payload)
+        if len(chunk) >= chunk_size:
+            yield from _calculate_chunk(chunk)
+            chunk = []
+    if chunk:
+        yield from _calculate_chunk(chunk)
+
+
+def _calculate_chunk(payloads):
+    results = [None] * len(payloads)
+    positions = []
+    rows = []
+    for position, payload in enumerate(payloads):
+        try:
+            rows.append(calculation_inputs(payload))
+            positions.append(position)
+        except (ValueError, TypeError, AttributeError) as e:
+            results[position] = {'error': str(e)}
+
+    if rows:
+        columns = {key: np.array([row[key] for row in rows], dtype=float) for key in rows[0]}
+        totals, table = evaluate(columns)
+        for i, (position, calculations) in enumerate(zip(positions, totals_rows(totals))):
+            results[position] = {'calculations': calculations, 'projections': projection_rows(table, i)}
+    return results
@@ -0,0 +1,111 @@
+"""
+Set-based deletion of a user and everything they own.
+
+purge_user removes the whole tree (including the snapshot history) in one transaction with one DELETE per
+table, children first, without loading any rows into the session. Very
+large accounts can instead be purged in the background in fixed-size
+chunks, each its own short transaction, so the write lock is never held for
+long; the user row goes last, so an interrupted purge can simply be re-run.
+The ON DELETE CASCADE constraints remain as a safety net for rows written
+concurrently with the purge.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from src.models.user import db, User
+from src.models.financial import (
+    FinancialExpense, FinancialGoal, FinancialLoan, FinancialProfile, FinancialScenario, FinancialSnapshot,
+)
+
+# Children before their parents
+CHILD_MODELS = (FinancialSnapshot, FinancialGoal, FinancialExpense, FinancialLoan, FinancialScenario)
+
+PURGE_CHUNK_SIZE = int(os.environ.get('PURGE_CHUNK_SIZE', 5000))
+
+_executor = None
+
+
+def _get_executor():
+    """Single background thread shared by all purges in this worker, created on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='purge')
+    return _executor
+
+
+def _owned_by(model, user_id):
+    """Rows of a child table belonging to the user directly or through one of their profiles"""
+    profile_ids = db.select(FinancialProfile.id).where(FinancialProfile.user_id == user_id)
+    return db.or_(model.user_id == user_id, model.profile_id.in_(profile_ids))
+
+
+def _purge_statements(user_id):
+    """(label, model, where clause) in deletion order"""
+    statements = [(model.__tablename__, model, _owned_by(model, user_id)) for model in CHILD_MODELS]
+    statements.append((FinancialProfile.__tablename__, FinancialProfile, FinancialProfile.user_id == user_id))
+    statements.append((User.__tablename__, User, User.id == user_id))
+    return statements
+
+
+def purge_user(user_id):
+    """
+    Delete a user and all of their financial data in one transaction.
+
+    Returns the number of rows deleted per table. Raises LookupError if the
+    user does not exist.
+    """
+    if not db.session.get(User, user_id):
+        raise LookupError('User not found')
+
+    deleted = {}
+    for label, model, where in _purge_statements(user_id):
+        result = db.session.execute(
+            db.delete(model).where(where), execution_options={'synchronize_session': False}
+        )
+        deleted[label] = result.rowcount
+    db.session.commit()
+    db.session.expunge_all()
+    return deleted
+
+
+def purge_user_chunked(user_id, chunk_size=PURGE_CHUNK_SIZE):
+    """Delete the same tree as purge_user, committing every `chunk_size` rows"""
+    deleted = {}
+    for label, model, where in _purge_statements(user_id):
+        deleted[label] = 0
+        while True:
+            # Ids are fetched first: MySQL rejects LIMIT in a subquery on the table being deleted from
+            ids = db.session.execute(db.select(model.id).where(where).limit(chunk_size)).scalars().all()
+            if ids:
+                db.session.execute(
+                    db.delete(model).where(model.id.in_(ids)), execution_options={'synchronize_session': False}
+                )
+            db.session.commit()
+            deleted[label] += len(ids)
+            if len(ids) < chunk_size:
+                break
+    db.session.expunge_all()
+    return deleted
+
+
+def purge_user_in_background(app, user_id, chunk_size=PURGE_CHUNK_SIZE):
+    """
+    Queue a chunked purge on the background thread.
+
+    Checks that the user exists first (LookupError otherwise) and returns
+    the Future for the per-table counts.
+    """
+    if not db.session.get(User, user_id):
+        raise LookupError('User not found')
+
+    def run():
+        with app.app_context():
+            try:
+                return purge_user_chunked(user_id, chunk_size)
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('Background purge of user %s failed', user_id)
+                raise
+
+    return _get_executor().submit(run)
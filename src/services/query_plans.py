@@ -0,0 +1,67 @@
+"""
+EXPLAIN QUERY PLAN checks for the hot read paths.
+
+Each entry mirrors a query the routes actually issue. A plan that scans a
+whole table, or sorts through a temporary B-tree instead of reading an
+index in order, means an index is missing or no longer usable.
+"""
+
+from src.models.user import db, User
+from src.models.financial import (
+    FinancialExpense, FinancialGoal, FinancialLoan, FinancialProfile, FinancialScenario, FinancialSnapshot,
+)
+from src.services.ordering import ORDERED_MODELS
+
+
+def hot_queries():
+    """(label, statement) for every query the checks cover"""
+    queries = [
+        ('profile by user', db.select(FinancialProfile).where(FinancialProfile.user_id == 1).limit(1)),
+        ('user by username', db.select(User).where(User.username_normalized == 'name')),
+        ('user by email', db.select(User).where(User.email_normalized == 'name@example.com')),
+        ('scenarios page', db.select(FinancialScenario).where(FinancialScenario.user_id == 1)
+            .order_by(FinancialScenario.id).limit(50)),
+        ('history range', db.select(FinancialSnapshot.taken_at, FinancialSnapshot.net_worth)
+            .where(FinancialSnapshot.profile_id == 1, FinancialSnapshot.taken_at >= '2025-01-01')
+            .order_by(FinancialSnapshot.taken_at)),
+        ('scenarios by profile', db.select(FinancialScenario).where(FinancialScenario.profile_id.in_([1]))),
+    ]
+    for kind, model in ORDERED_MODELS.items():
+        page = db.select(model).where(model.user_id == 1).order_by(model.order_index, model.id).limit(50)
+        queries += [
+            (f'{kind} first page', page),
+            (f'{kind} next page', page.where(db.tuple_(model.order_index, model.id) > (1024, 1))),
+            # selectinload of one profile's children (dashboard, summary)
+            (f'{kind} by profile', db.select(model).where(model.profile_id.in_([1])).order_by(model.order_index)),
+            (f'{kind} max order_index', db.select(db.func.max(model.order_index)).where(model.profile_id == 1)),
+        ]
+    return queries
+
+
+def plan_problems(detail):
+    """Why a plan step is a regression, or None"""
+    if detail.startswith('SCAN ') and ' INDEX ' not in detail:
+        return 'full table scan'
+    if 'USE TEMP B-TREE' in detail:
+        return 'sort without an index'
+    return None
+
+
+def check_query_plans(connection):
+    """
+    Run EXPLAIN QUERY PLAN on every hot query (SQLite only).
+
+    Returns [(label, plan_lines, problems)]; problems is empty when the plan
+    uses indexes throughout.
+    """
+    if connection.dialect.name != 'sqlite':
+        raise RuntimeError('Query plan checks are only implemented for SQLite')
+
+    results = []
+    for label, statement in hot_queries():
+        # The sample values are constants above, so inlining them is safe
+        sql = statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True})
+        plan = [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+        problems = [f'{detail}: {problem}' for detail in plan if (problem := plan_problems(detail))]
+        results.append((label, plan, problems))
+    return results
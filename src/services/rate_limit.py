@@ -0,0 +1,291 @@
+"""
+Token-bucket rate limiting for the sign-in and calculation endpoints.
+
+Every client IP, and every signed-in user, has a bucket that refills at a
+steady rate up to a burst capacity. Each limited route costs a number of
+tokens according to the work it triggers, so one password check weighs as
+much as ten calculations. A request is admitted only if all of its buckets
+can pay; otherwise it is answered 429 with Retry-After from a before_request
+hook, before any database query or password hash.
+
+The sign-in routes (AUTH_ROUTES) and the calculation routes draw on separate
+buckets, 'ip:<addr>:auth' / 'user:<id>:auth' and their ':compute'
+counterparts, so running simulations never locks a user out of signing in
+or changing their password. The compute buckets are sized for a slider
+firing a sweep several times a second.
+
+/login also has a bucket per account being signed into, which throttles
+guessing against one account whichever IPs it comes from. It is checked up
+front but only charged for a failed password check (charge_failed_login), so
+nobody can lock an account's owner out without knowing the password.
+
+Buckets live in process memory by default. The 'sqlite' backend keeps them
+in a local file so that every worker process on the node shares the same
+limits.
+
+Client IPs come from X-Forwarded-For when RATE_LIMIT_PROXY_HOPS trusted
+proxies sit in front of the app. It defaults to 1 when RENDER is set, since
+Render's load balancer is then the peer of every request; elsewhere to 0,
+as a forwarded header the app cannot trust would let a client pick its IP.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify, request, session
+
+# Tokens charged per request, by endpoint
+ROUTE_COSTS = {
+    'user.login': 10,
+    'user.register': 20,
+    'user.change_password': 10,
+    'financial.calculate_financial_projections': 1,
+    'financial.calculate_financial_projections_batch': 10,
+    'financial.simulate_financial_projections': 10,
+    # One vectorized grid, recomputed on every slider move
+    'financial.sweep_financial_projections': 2,
+}
+
+# Routes charged to the auth buckets; every other limited route is a calculation
+AUTH_ROUTES = frozenset(('user.login', 'user.register', 'user.change_password'))
+
+
+def _refill(tokens, updated_at, capacity, rate, now):
+    if tokens is None:
+        return capacity
+    return min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+
+def _admit(levels, buckets, cost):
+    """Seconds until every bucket holds `cost` tokens; 0 if they already do"""
+    return max(
+        (cost - tokens) / rate if tokens < cost else 0.0
+        for tokens, (_, _, rate) in zip(levels, buckets)
+    )
+
+
+class MemoryBucketStore:
+    """Buckets in this process, least recently used dropped past `max_keys`"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def wait(self, buckets, cost, now):
+        """Seconds until every bucket holds `cost` tokens, without charging them"""
+        with self._lock:
+            levels = [
+                _refill(*self._buckets.get(key, (None, None)), capacity, rate, now)
+                for key, capacity, rate in buckets
+            ]
+        return _admit(levels, buckets, cost)
+
+    def take(self, buckets, cost, now):
+        """
+        Charge `cost` to every (key, capacity, refill per second) bucket, or to none.
+
+        Returns 0 when admitted, else the seconds to wait.
+        """
+        with self._lock:
+            levels = [
+                _refill(*self._buckets.get(key, (None, None)), capacity, rate, now)
+                for key, capacity, rate in buckets
+            ]
+            wait = _admit(levels, buckets, cost)
+            if wait:
+                return wait
+            for tokens, (key, _, _) in zip(levels, buckets):
+                self._buckets[key] = (tokens - cost, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                # A forgotten bucket starts over full, so this only ever errs towards admitting
+                self._buckets.popitem(last=False)
+            return 0.0
+
+
+class SQLiteBucketStore:
+    """Buckets in a local SQLite file shared by every worker process on the node"""
+
+    # Buckets untouched this long are full again and can be dropped
+    IDLE_SECONDS = 3600
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit_bucket ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+
+    def _connect(self):
+        # One connection per thread; sqlite3 connections are not shareable across threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _stored(self, connection, buckets):
+        return {
+            key: (tokens, updated_at)
+            for key, tokens, updated_at in connection.execute(
+                f'SELECT key, tokens, updated_at FROM rate_limit_bucket WHERE key IN ({", ".join("?" * len(buckets))})',
+                [key for key, _, _ in buckets]
+            )
+        }
+
+    def wait(self, buckets, cost, now):
+        stored = self._stored(self._connect(), buckets)
+        levels = [
+            _refill(*stored.get(key, (None, None)), capacity, rate, now)
+            for key, capacity, rate in buckets
+        ]
+        return _admit(levels, buckets, cost)
+
+    def take(self, buckets, cost, now):
+        connection = self._connect()
+        # IMMEDIATE: read-modify-write under the write lock, so concurrent workers cannot both spend a token
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            stored = self._stored(connection, buckets)
+            levels = [
+                _refill(*stored.get(key, (None, None)), capacity, rate, now)
+                for key, capacity, rate in buckets
+            ]
+            wait = _admit(levels, buckets, cost)
+            if not wait:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO rate_limit_bucket (key, tokens, updated_at) VALUES (?, ?, ?)',
+                    [(key, tokens - cost, now) for tokens, (key, _, _) in zip(levels, buckets)]
+                )
+                self._takes += 1
+                if self._takes % self.PRUNE_EVERY == 0:
+                    connection.execute('DELETE FROM rate_limit_bucket WHERE updated_at < ?', (now - self.IDLE_SECONDS,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return wait
+
+
+class RateLimiter:
+    """Per-IP and per-user token buckets over a store, one set for sign-in and one for calculations"""
+
+    def __init__(self, store, ip_limit=(100, 2.0), user_limit=(50, 0.5), compute_ip_limit=(300, 15.0),
+                 compute_user_limit=(100, 5.0), costs=ROUTE_COSTS, proxy_hops=0):
+        self.store = store
+        self.ip_limit = ip_limit
+        self.user_limit = user_limit
+        self.compute_ip_limit = compute_ip_limit
+        self.compute_user_limit = compute_user_limit
+        self.costs = costs
+        self.proxy_hops = proxy_hops
+
+    def client_ip(self):
+        """The caller's address, taken from X-Forwarded-For when behind `proxy_hops` trusted proxies"""
+        if self.proxy_hops:
+            forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+            if len(forwarded) >= self.proxy_hops:
+                return forwarded[-self.proxy_hops]
+        return request.remote_addr
+
+    def user_key(self, pool):
+        if session.get('user_id') is not None:
+            return f"user:{session['user_id']}:{pool}"
+        return None
+
+    def login_bucket(self, username):
+        """The (key, capacity, rate) bucket of the account a sign-in names"""
+        return (f'login:{username.strip().lower()}', *self.user_limit)
+
+    def check(self):
+        """Seconds the current request must wait, or 0 if it is admitted (and charged)"""
+        cost = self.costs.get(request.endpoint)
+        if not cost:
+            return 0.0
+        now = time.time()
+        if request.endpoint in AUTH_ROUTES:
+            pool, ip_limit, user_limit = 'auth', self.ip_limit, self.user_limit
+        else:
+            pool, ip_limit, user_limit = 'compute', self.compute_ip_limit, self.compute_user_limit
+        buckets = [(f'ip:{self.client_ip()}:{pool}', *ip_limit)]
+        user_key = self.user_key(pool)
+        if user_key:
+            buckets.append((user_key, *user_limit))
+
+        if request.endpoint == 'user.login':
+            body = request.get_json(silent=True)
+            if isinstance(body, dict) and isinstance(body.get('username'), str):
+                # Checked, not charged: only failed attempts are (see charge_failed_login)
+                account = [self.login_bucket(body['username'])]
+                wait = self.store.wait(account, min(cost, self.user_limit[0]), now)
+                if wait:
+                    return wait
+
+        # A cost above a bucket's capacity could never be paid
+        cost = min(cost, *(capacity for _, capacity, _ in buckets))
+        return self.store.take(buckets, cost, now)
+
+    def charge_failed_login(self, username):
+        """Charge a failed password check to the account's bucket"""
+        cost = min(self.costs.get('user.login', 0), self.user_limit[0])
+        if cost:
+            self.store.take([self.login_bucket(username)], cost, time.time())
+
+
+def rate_limiter_from_env():
+    """Build the limiter from RATE_LIMIT_* settings, or None when disabled"""
+    backend = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    ip_limit = (float(os.environ.get('RATE_LIMIT_IP_CAPACITY', 100)), float(os.environ.get('RATE_LIMIT_IP_REFILL', 2)))
+    user_limit = (float(os.environ.get('RATE_LIMIT_USER_CAPACITY', 50)), float(os.environ.get('RATE_LIMIT_USER_REFILL', 0.5)))
+    compute_ip_limit = (float(os.environ.get('RATE_LIMIT_COMPUTE_IP_CAPACITY', 300)),
+                        float(os.environ.get('RATE_LIMIT_COMPUTE_IP_REFILL', 15)))
+    compute_user_limit = (float(os.environ.get('RATE_LIMIT_COMPUTE_USER_CAPACITY', 100)),
+                          float(os.environ.get('RATE_LIMIT_COMPUTE_USER_REFILL', 5)))
+    # Behind Render's load balancer unless told otherwise
+    proxy_hops = int(os.environ.get('RATE_LIMIT_PROXY_HOPS', 1 if os.environ.get('RENDER') else 0))
+
+    if backend == 'off':
+        return None
+    if backend == 'sqlite':
+        store = SQLiteBucketStore(os.environ.get('RATE_LIMIT_PATH', '/tmp/life_sheet_rate_limit.db'))
+    elif backend == 'memory':
+        store = MemoryBucketStore(max_keys=int(os.environ.get('RATE_LIMIT_MAX_KEYS', 10000)))
+    else:
+        raise ValueError(f'Unknown RATE_LIMIT_BACKEND: {backend}')
+    return RateLimiter(store, ip_limit=ip_limit, user_limit=user_limit, compute_ip_limit=compute_ip_limit,
+                       compute_user_limit=compute_user_limit, proxy_hops=proxy_hops)
+
+
+def init_rate_limiting(app, limiter):
+    """Answer over-limit requests with 429 before their view runs; does nothing without a limiter"""
+    if limiter is None:
+        return
+    app.extensions['rate_limiter'] = limiter
+
+    @app.before_request
+    def enforce_rate_limit():
+        if request.method == 'OPTIONS':
+            return None
+        wait = limiter.check()
+        if wait:
+            retry_after = max(1, math.ceil(wait))
+            return jsonify({'error': 'Too many requests, please retry later'}), 429, {'Retry-After': str(retry_after)}
+        return None
+
+
+def charge_failed_login(username):
+    """Charge a failed sign-in to the account's bucket; does nothing without a limiter"""
+    limiter = current_app.extensions.get('rate_limiter')
+    if limiter is not None:
+        limiter.charge_failed_login(username)
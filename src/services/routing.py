@@ -0,0 +1,116 @@
+"""
+Read/write routing for db.session.
+
+Safe (GET/HEAD) requests to the read-routed blueprints run their queries on
+the 'read' bind: a replica, or a read-only pool on the SQLite file. Flushes
+and INSERT/UPDATE/DELETE statements always go to the primary.
+
+A client that has just written is kept on the primary for a short
+read-your-writes window, so a replica that lags behind cannot hand it back
+stale data. Recent writes are remembered both in the Flask session cookie
+and per user_id, since cross-site API clients may not send the cookie.
+A request counts as a write only if it committed an INSERT, UPDATE or
+DELETE on the primary, whatever its HTTP method: a calculation POST or a
+logout leaves the cookie alone.
+"""
+
+import time
+
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+READ_BIND = 'read'
+SAFE_METHODS = frozenset(('GET', 'HEAD'))
+READ_ROUTED_BLUEPRINTS = frozenset(('financial', 'user'))
+# Bound on the per-user write timestamps kept in memory
+MAX_TRACKED_WRITERS = 10000
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the 'read' bind while the request allows it"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not isinstance(clause, UpdateBase)
+                and has_request_context() and g.get('read_only', False)):
+            engine = self._db.engines.get(READ_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _request_user_id():
+    """user_id named by the URL or the JSON body, if any"""
+    user_id = (request.view_args or {}).get('user_id')
+    if user_id is None and request.is_json:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            user_id = body.get('user_id')
+    return user_id
+
+
+def _track_writes(engine):
+    """Flag the request in `g` once a transaction on `engine` commits a data change"""
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def note_write(connection, cursor, statement, parameters, context, executemany):
+        if has_request_context() and statement.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            g.uncommitted_write = True
+
+    @event.listens_for(engine, 'commit')
+    def note_commit(connection):
+        if has_request_context() and g.pop('uncommitted_write', False):
+            g.committed_write = True
+
+    @event.listens_for(engine, 'rollback')
+    def note_rollback(connection):
+        if has_request_context():
+            g.pop('uncommitted_write', None)
+
+
+def init_read_routing(app, window=5):
+    """
+    Route safe requests to the read bind, except within `window` seconds of a write.
+
+    Does nothing when SQLALCHEMY_BINDS has no 'read' entry.
+    """
+    if READ_BIND not in (app.config.get('SQLALCHEMY_BINDS') or {}):
+        return
+
+    with app.app_context():
+        for bind, engine in app.extensions['sqlalchemy'].engines.items():
+            if bind != READ_BIND:
+                _track_writes(engine)
+
+    recent_writers = {}
+
+    def wrote_recently(now):
+        if now - session.get('last_write_at', 0) < window:
+            return True
+        user_id = _request_user_id()
+        return user_id is not None and now - recent_writers.get(user_id, 0) < window
+
+    @app.before_request
+    def choose_bind():
+        g.read_only = (
+            request.method in SAFE_METHODS
+            and request.blueprint in READ_ROUTED_BLUEPRINTS
+            and not wrote_recently(time.time())
+        )
+
+    @app.after_request
+    def remember_write(response):
+        if not g.get('committed_write'):
+            return response
+
+        now = time.time()
+        session['last_write_at'] = now
+        user_id = _request_user_id()
+        if user_id is not None:
+            if len(recent_writers) >= MAX_TRACKED_WRITERS:
+                for stale in [key for key, at in recent_writers.items() if now - at >= window]:
+                    del recent_writers[stale]
+            recent_writers[user_id] = now
+        return response
@@ -0,0 +1,183 @@
+"""
+Monte Carlo simulation of the surplus/deficit with stochastic growth rates.
+
+Asset returns and inflation are drawn as (paths x years) matrices. Income
+tracks the inflation surprises around its own growth rate and expenses grow
+with inflation. Paths are split into fixed-size blocks, each seeded from one
+SeedSequence, so a given seed reproduces the same result no matter how many
+worker processes evaluate the blocks.
+
+Memory is bounded per request: blocks are copied into two preallocated
+(paths x years) matrices as they arrive, percentiles are taken a few years
+at a time, and paths x years may not exceed MAX_SIMULATION_CELLS.
+"""
+
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from src.services.projection import BASE_YEAR, calculation_inputs, cumulative_growth, projection_span, working_years
+
+# Percentile bands returned for net worth and surplus
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Paths per block; blocks are the unit of work sent to the process pool
+BLOCK_PATHS = 2500
+MAX_PATHS = 100000
+# Bound on paths x projected years: each result matrix holds this many float64 values (32 MB)
+MAX_SIMULATION_CELLS = int(os.environ.get('MAX_SIMULATION_CELLS', 4000000))
+# Years per percentile pass; np.percentile copies the columns it sorts
+PERCENTILE_CHUNK_YEARS = 8
+
+# Simulation options on top of the /calculate inputs
+SIMULATION_DEFAULTS = {
+    'paths': 1000,
+    'asset_volatility': 0.12,
+    'inflation_rate': 0.06,
+    'inflation_volatility': 0.02,
+}
+
+SIMULATION_WORKERS = int(os.environ.get('SIMULATION_WORKERS', os.cpu_count() or 1))
+# Never fork the web worker itself: its DB pool, hashing and purge threads may hold locks at that moment
+SIMULATION_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_executor = None
+
+
+def _get_executor():
+    """Process pool shared by all requests in this worker, created on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=SIMULATION_WORKERS, mp_context=multiprocessing.get_context(SIMULATION_START_METHOD)
+        )
+    return _executor
+
+
+def simulation_options(data):
+    """Read and validate the simulation options from a request payload"""
+    options = {key: data.get(key, default) for key, default in SIMULATION_DEFAULTS.items()}
+
+    paths = options['paths']
+    if isinstance(paths, bool) or not isinstance(paths, int) or not 1 <= paths <= MAX_PATHS:
+        raise ValueError(f'paths must be an integer between 1 and {MAX_PATHS}')
+    for key in ('asset_volatility', 'inflation_rate', 'inflation_volatility'):
+        if isinstance(options[key], bool) or not isinstance(options[key], (int, float)):
+            raise ValueError(f'Invalid numeric value for {key}')
+    if options['asset_volatility'] < 0 or options['inflation_volatility'] < 0:
+        raise ValueError('Volatilities must not be negative')
+
+    seed = data.get('seed')
+    if seed is None:
+        # Hand the seed back in the response so the run can be reproduced
+        seed = secrets.randbits(32)
+    elif isinstance(seed, bool) or not isinstance(seed, int) or seed < 0:
+        raise ValueError('seed must be a non-negative integer')
+    options['seed'] = seed
+    return options
+
+
+def simulate_block(seed, paths, params):
+    """
+    Simulate one block of paths.
+
+    Returns the net worth matrix (paths x horizon + 1) and the annual
+    surplus matrix (paths x horizon).
+    """
+    rng = np.random.default_rng(seed)
+    horizon = params['horizon']
+    years = np.arange(horizon)
+
+    returns = rng.normal(params['asset_growth_rate'], params['asset_volatility'], (paths, horizon))
+    inflation = rng.normal(params['inflation_rate'], params['inflation_volatility'], (paths, horizon))
+
+    income_growth = params['income_growth_rate'] + (inflation - params['inflation_rate'])
+    income = params['income'] * cumulative_growth(income_growth) * (years < params['working_years'])
+    expenses = params['annual_expenses'] * cumulative_growth(inflation) * (years < params['remaining_life_years'])
+    surplus = income - expenses
+
+    # W[t + 1] = W[t] * (1 + r[t]) + surplus[t], solved for every year at once:
+    # W[t + 1] = G[t] * (W[0] + sum(surplus[:t + 1] / G[:t + 1])) with G the cumulative asset growth
+    growth = np.cumprod(1 + np.maximum(returns, -0.99), axis=1)
+    net_worth = np.empty((paths, horizon + 1))
+    net_worth[:, 0] = params['starting_net_worth']
+    net_worth[:, 1:] = growth * (params['starting_net_worth'] + np.cumsum(surplus / growth, axis=1))
+    return net_worth, surplus
+
+
+def _bands(values, age):
+    """Percentile band rows (one per year) for a (paths x years) matrix"""
+    bands = []
+    for start in range(0, values.shape[1], PERCENTILE_CHUNK_YEARS):
+        chunk = values[:, start:start + PERCENTILE_CHUNK_YEARS]
+        bands.extend(np.percentile(chunk, PERCENTILES, axis=0).T.tolist())
+    keys = [f'p{percentile}' for percentile in PERCENTILES]
+    return [
+        dict(zip(keys, (round(value) for value in row)), year=BASE_YEAR + year, age=age + year)
+        for year, row in enumerate(bands)
+    ]
+
+
+def simulate(data):
+    """Run the Monte Carlo simulation for a /calculate style payload"""
+    inputs = calculation_inputs(data)
+    options = simulation_options(data)
+
+    age = inputs['age']
+    params = {
+        'horizon': int(projection_span(age, inputs['work_tenure_years'], inputs['lifespan_years'])),
+        'income': inputs['current_annual_gross_income'],
+        'working_years': float(working_years(age, inputs['work_tenure_years'])),
+        'remaining_life_years': max(0, inputs['lifespan_years'] - age),
+        'annual_expenses': inputs['annual_expenses'],
+        # Goals are treated as liabilities due today, as in the surplus/deficit sheet
+        'starting_net_worth': (inputs['total_asset_gross_market_value'] - inputs['total_loan_outstanding_value']
+                               - inputs['financial_goals']),
+        'income_growth_rate': inputs['income_growth_rate'],
+        'asset_growth_rate': inputs['asset_growth_rate'],
+        'asset_volatility': options['asset_volatility'],
+        'inflation_rate': options['inflation_rate'],
+        'inflation_volatility': options['inflation_volatility'],
+    }
+
+    paths = options['paths']
+    horizon = params['horizon']
+    if paths * (horizon + 1) > MAX_SIMULATION_CELLS:
+        raise ValueError(f'paths must be at most {MAX_SIMULATION_CELLS // (horizon + 1)} for a {horizon} year projection')
+
+    sizes = [min(BLOCK_PATHS, paths - start) for start in range(0, paths, BLOCK_PATHS)]
+    seeds = np.random.SeedSequence(options['seed']).spawn(len(sizes))
+    if len(sizes) > 1 and SIMULATION_WORKERS > 1:
+        blocks = _get_executor().map(simulate_block, seeds, sizes, repeat(params))
+    else:
+        blocks = (simulate_block(seed, size, params) for seed, size in zip(seeds, sizes))
+
+    # Copy each block into place as it arrives, so only one is held besides the results
+    net_worth = np.empty((paths, horizon + 1))
+    surplus = np.empty((paths, horizon))
+    start = 0
+    for block_net_worth, block_surplus in blocks:
+        end = start + len(block_net_worth)
+        net_worth[start:end] = block_net_worth
+        surplus[start:end] = block_surplus
+        start = end
+    terminal = net_worth[:, -1]
+
+    return {
+        'simulation': {
+            'paths': paths,
+            'seed': options['seed'],
+            # A path succeeds if net worth is still non-negative at the end of lifespan
+            'success_probability': float(np.mean(terminal >= 0)),
+            'terminal_net_worth': {
+                f'p{percentile}': round(value)
+                for percentile, value in zip(PERCENTILES, np.percentile(terminal, PERCENTILES).tolist())
+            },
+            'net_worth': _bands(net_worth, age),
+            'surplus': _bands(surplus, age),
+        }
+    }
@@ -0,0 +1,202 @@
+"""
+Net-worth history for trend charts.
+
+Every commit that changes a profile (its own fields or its goal, expense and
+loan totals) appends one FinancialSnapshot with the derived totals, unless
+they are the same as the profile's previous snapshot. History queries
+downsample the series into buckets in a single ordered index range scan,
+keeping the last value of each bucket. compact_snapshots thins out old
+history the same way, so the number of rows per profile stays bounded:
+everything for the recent past, one row per day after that, one per month
+beyond.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+from src.models.user import db
+from src.models.financial import FinancialProfile, FinancialSnapshot
+from src.services.routing import RoutingSession
+
+SNAPSHOT_FIELDS = ('net_worth', 'surplus_deficit', 'human_capital')
+
+BUCKETS = ('raw', 'day', 'week', 'month', 'year')
+
+# Retention: full resolution for RAW days, then daily up to DAILY days, then monthly
+SNAPSHOT_RAW_DAYS = int(os.environ.get('SNAPSHOT_RAW_DAYS', 30))
+SNAPSHOT_DAILY_DAYS = int(os.environ.get('SNAPSHOT_DAILY_DAYS', 730))
+
+COMPACTION_BATCH_SIZE = 1000
+
+
+def bucket_start(taken_at, bucket):
+    """Start of the bucket containing `taken_at`"""
+    if bucket == 'raw':
+        return taken_at
+    day = taken_at.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == 'day':
+        return day
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+
+def snapshot_values(profile):
+    return {
+        'net_worth': profile.calculate_current_networth(),
+        'surplus_deficit': profile.calculate_surplus_deficit(),
+        'human_capital': profile.calculate_total_human_capital(),
+    }
+
+
+def record_snapshots(session, profile_ids):
+    """Append snapshots for the given profiles, skipping those whose totals did not change"""
+    # populate_existing: the aggregate columns may have been updated behind the loaded objects
+    profiles = session.execute(
+        db.select(FinancialProfile)
+        .where(FinancialProfile.id.in_(profile_ids))
+        .execution_options(populate_existing=True)
+    ).scalars().all()
+    if not profiles:
+        return 0
+
+    latest = (
+        db.select(FinancialSnapshot.profile_id, db.func.max(FinancialSnapshot.taken_at).label('taken_at'))
+        .where(FinancialSnapshot.profile_id.in_([profile.id for profile in profiles]))
+        .group_by(FinancialSnapshot.profile_id)
+        .subquery()
+    )
+    previous = {
+        row.profile_id: tuple(getattr(row, field) for field in SNAPSHOT_FIELDS)
+        for row in session.execute(
+            db.select(FinancialSnapshot.profile_id, *[getattr(FinancialSnapshot, field) for field in SNAPSHOT_FIELDS])
+            .join(latest, db.and_(FinancialSnapshot.profile_id == latest.c.profile_id,
+                                  FinancialSnapshot.taken_at == latest.c.taken_at))
+        )
+    }
+
+    now = datetime.utcnow()
+    rows = []
+    for profile in profiles:
+        values = snapshot_values(profile)
+        if previous.get(profile.id) == tuple(values[field] for field in SNAPSHOT_FIELDS):
+            continue
+        rows.append(dict(values, user_id=profile.user_id, profile_id=profile.id, taken_at=now))
+    if rows:
+        session.execute(db.insert(FinancialSnapshot), rows)
+    return len(rows)
+
+
+@db.event.listens_for(RoutingSession, 'before_commit')
+def _snapshot_changed_profiles(session):
+    # Flush first: the flush itself may mark more profiles as changed
+    session.flush()
+    profile_ids = session.info.pop('changed_profiles', None)
+    if profile_ids:
+        record_snapshots(session, profile_ids)
+
+
+@db.event.listens_for(RoutingSession, 'after_rollback')
+def _forget_changed_profiles(session):
+    session.info.pop('changed_profiles', None)
+
+
+def _parse_time(value, name):
+    """ISO 8601 query arg as a naive UTC datetime, matching the stored timestamps"""
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Invalid {name}: expected an ISO 8601 date or datetime')
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def history(user_id, args):
+    """
+    Downsampled snapshot series for a user's profile.
+
+    Query args: from / to (ISO dates, inclusive / exclusive) and bucket
+    (raw, day, week, month or year; default day). Each point carries the
+    bucket start, the last values seen in the bucket, and the number of
+    snapshots it summarizes. Raises LookupError if the user has no profile.
+    """
+    bucket = args.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        raise ValueError(f'bucket must be one of: {", ".join(BUCKETS)}')
+    start, end = _parse_time(args.get('from'), 'from'), _parse_time(args.get('to'), 'to')
+
+    profile_id = db.session.execute(
+        db.select(FinancialProfile.id).where(FinancialProfile.user_id == user_id).limit(1)
+    ).scalar()
+    if profile_id is None:
+        raise LookupError('Financial profile not found')
+
+    query = (
+        db.select(FinancialSnapshot.taken_at, *[getattr(FinancialSnapshot, field) for field in SNAPSHOT_FIELDS])
+        .where(FinancialSnapshot.profile_id == profile_id)
+        .order_by(FinancialSnapshot.taken_at)
+    )
+    if start:
+        query = query.where(FinancialSnapshot.taken_at >= start)
+    if end:
+        query = query.where(FinancialSnapshot.taken_at < end)
+
+    points = []
+    for row in db.session.execute(query):
+        key = bucket_start(row.taken_at, bucket)
+        if points and points[-1]['bucket'] == key:
+            point = points[-1]
+            point['count'] += 1
+        else:
+            point = {'bucket': key, 'count': 1}
+            points.append(point)
+        for field in SNAPSHOT_FIELDS:
+            point[field] = getattr(row, field)
+
+    for point in points:
+        point['bucket'] = point['bucket'].isoformat()
+    return {'profile_id': profile_id, 'bucket': bucket, 'points': points}
+
+
+def compact_snapshots(raw_days=SNAPSHOT_RAW_DAYS, daily_days=SNAPSHOT_DAILY_DAYS, now=None):
+    """
+    Keep only the last snapshot per day once older than `raw_days`, and per month once older than `daily_days`.
+
+    Streams the old history in one ordered pass and deletes in batches.
+    Returns the number of snapshots removed.
+    """
+    now = now or datetime.utcnow()
+    raw_cutoff = now - timedelta(days=raw_days)
+    daily_cutoff = now - timedelta(days=daily_days)
+
+    def bucket_key(row):
+        bucket = 'month' if row.taken_at < daily_cutoff else 'day'
+        return row.profile_id, bucket, bucket_start(row.taken_at, bucket)
+
+    rows = db.session.execute(
+        db.select(FinancialSnapshot.id, FinancialSnapshot.profile_id, FinancialSnapshot.taken_at)
+        .where(FinancialSnapshot.taken_at < raw_cutoff)
+        .order_by(FinancialSnapshot.profile_id, FinancialSnapshot.taken_at)
+        .execution_options(yield_per=COMPACTION_BATCH_SIZE)
+    )
+
+    # A row is superseded when the next row of the same profile falls in the same bucket
+    doomed = []
+    previous = None
+    for row in rows:
+        if previous is not None and bucket_key(previous) == bucket_key(row):
+            doomed.append(previous.id)
+        previous = row
+
+    for offset in range(0, len(doomed), COMPACTION_BATCH_SIZE):
+        db.session.execute(
+            db.delete(FinancialSnapshot).where(FinancialSnapshot.id.in_(doomed[offset:offset + COMPACTION_BATCH_SIZE])),
+            execution_options={'synchronize_session': False}
+        )
+    db.session.commit()
+    return len(doomed)
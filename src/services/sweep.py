@@ -0,0 +1,120 @@
+"""
+Parameter sweeps over the /calculate inputs.
+
+Each swept input becomes one axis of a grid. The inputs are reshaped so they
+broadcast against each other, and every cell of the result surface comes out
+of a single vectorized evaluation rather than one /calculate call per cell.
+"""
+
+import numpy as np
+
+from src.services.projection import CALCULATION_DEFAULTS, calculate_totals, calculation_inputs, projection_span, working_years
+
+# Inputs that may be swept; whole-year inputs are rounded and de-duplicated
+SWEEPABLE_INPUTS = tuple(CALCULATION_DEFAULTS) + ('annual_expenses', 'financial_goals')
+INTEGER_INPUTS = ('age', 'work_tenure_years', 'lifespan_years')
+
+METRICS = (
+    'total_existing_assets',
+    'total_human_capital',
+    'total_existing_liabilities',
+    'total_future_expenses',
+    'total_financial_goals',
+    'current_networth',
+    'surplus_deficit',
+    'terminal_assets',   # asset value at the end of the projection
+    'lifetime_income',   # sum of projected income over the earning years
+)
+
+MAX_STEPS = 500
+MAX_SWEEP_CELLS = 100000
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def sweep_axes(spec):
+    """
+    Parse the 'sweep' object into (name, values) axes, in request order.
+
+    Each entry is either {'start': a, 'stop': b, 'steps': n} (inclusive,
+    evenly spaced) or {'values': [...]}.
+    """
+    if not isinstance(spec, dict) or not spec:
+        raise ValueError('sweep must map input names to ranges')
+
+    axes = []
+    for name, axis in spec.items():
+        if name not in SWEEPABLE_INPUTS:
+            raise ValueError(f'Cannot sweep {name}')
+        if not isinstance(axis, dict):
+            raise ValueError(f'Invalid range for {name}')
+
+        if 'values' in axis:
+            values = axis['values']
+            if not isinstance(values, list) or not values or not all(_is_number(value) for value in values):
+                raise ValueError(f'values for {name} must be a non-empty list of numbers')
+            values = np.array(values, dtype=float)
+        else:
+            start, stop, steps = axis.get('start'), axis.get('stop'), axis.get('steps')
+            if not (_is_number(start) and _is_number(stop)):
+                raise ValueError(f'start and stop for {name} must be numbers')
+            if not isinstance(steps, int) or isinstance(steps, bool) or not 1 <= steps <= MAX_STEPS:
+                raise ValueError(f'steps for {name} must be an integer between 1 and {MAX_STEPS}')
+            values = np.linspace(start, stop, steps)
+
+        if name in INTEGER_INPUTS:
+            values = np.unique(np.rint(values))
+        axes.append((name, values))
+
+    if np.prod([len(values) for _, values in axes]) > MAX_SWEEP_CELLS:
+        raise ValueError(f'Sweep grid exceeds {MAX_SWEEP_CELLS} cells')
+    return axes
+
+
+def _lifetime_income(income, growth_rate, years):
+    """Closed-form sum of income * (1 + g) ** t over the earning years"""
+    growth_rate = np.asarray(growth_rate, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annuity = np.where(growth_rate == 0, years, (np.power(1 + growth_rate, years) - 1) / growth_rate)
+    return np.multiply(income, annuity)
+
+
+def sweep(data):
+    """Evaluate the requested metrics over the whole sweep grid"""
+    inputs = calculation_inputs(data)
+    axes = sweep_axes(data.get('sweep'))
+
+    metrics = data.get('metrics', ['surplus_deficit'])
+    if not isinstance(metrics, list) or not metrics or any(metric not in METRICS for metric in metrics):
+        raise ValueError(f'metrics must be a list drawn from: {", ".join(METRICS)}')
+
+    # Give each swept input its own axis so the inputs broadcast into a grid
+    for position, (name, values) in enumerate(axes):
+        shape = [1] * len(axes)
+        shape[position] = len(values)
+        inputs[name] = values.reshape(shape)
+
+    results = calculate_totals(
+        inputs['age'], inputs['current_annual_gross_income'], inputs['work_tenure_years'],
+        inputs['total_asset_gross_market_value'], inputs['total_loan_outstanding_value'],
+        inputs['lifespan_years'], inputs['annual_expenses'], inputs['financial_goals']
+    )
+    span = projection_span(inputs['age'], inputs['work_tenure_years'], inputs['lifespan_years'])
+    results['terminal_assets'] = np.multiply(
+        inputs['total_asset_gross_market_value'], np.power(1 + np.asarray(inputs['asset_growth_rate']), span)
+    )
+    results['lifetime_income'] = _lifetime_income(
+        inputs['current_annual_gross_income'], inputs['income_growth_rate'],
+        working_years(inputs['age'], inputs['work_tenure_years'])
+    )
+
+    shape = tuple(len(values) for _, values in axes)
+    return {
+        'axes': [{'name': name, 'values': values.tolist()} for name, values in axes],
+        'grid': {
+            metric: np.rint(np.broadcast_to(results[metric], shape)).astype(np.int64).tolist()
+            for metric in metrics
+        }
+    }
@@ -0,0 +1,300 @@
+"""
+Minimal streaming XLSX (Office Open XML spreadsheet) writer and reader.
+
+Worksheets are written straight into a deflated zip archive whose output
+is handed back in chunks as it is produced, so a workbook never has to be
+held in memory and the first bytes go out before the last row is read.
+Cells are written as numbers, booleans or inline strings; there is no
+shared string table and no styling.
+
+Reading goes the other way with iterparse, one <row> at a time. Only the
+shared string table, which Excel keeps in its own part, is loaded whole, and
+it is refused past MAX_SHARED_STRINGS entries or MAX_SHARED_STRINGS_BYTES.
+Cell references are refused past the last column Excel allows (XFD), and
+rows past the reader's max_columns, so a crafted reference such as ZZZZZZ1
+cannot make a row allocate millions of empty cells.
+"""
+
+import io
+import math
+import re
+import zipfile
+import xml.etree.ElementTree as ElementTree
+from xml.sax.saxutils import escape
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Rows written between two hand-offs of the compressed output
+FLUSH_ROWS = 500
+
+# Excel's own sheet width: columns A to XFD
+MAX_COLUMNS = 16384
+# Limits on the shared string table, the one part that is read whole
+MAX_SHARED_STRINGS = 1000000
+MAX_SHARED_STRINGS_BYTES = 64 * 1024 * 1024
+
+# Control characters are not allowed in XML 1.0 documents
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_SHEET_NAME_ILLEGAL = re.compile(r'[\[\]:*?/\\]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '{sheets}'
+    '</Types>'
+)
+_SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{number}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{sheets}</sheets>'
+    '</workbook>'
+)
+_WORKBOOK_SHEET = '<sheet name="{name}" sheetId="{number}" r:id="rId{number}"/>'
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{sheets}'
+    '</Relationships>'
+)
+_WORKBOOK_REL = (
+    '<Relationship Id="rId{number}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{number}.xml"/>'
+)
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_DOCUMENT_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+
+_CELL_COLUMN = re.compile(r'^([A-Z]+)')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable file that collects bytes until they are taken"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def column_letter(index):
+    """Spreadsheet column name for a 0-based index: 0 -> A, 26 -> AA"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def column_index(reference):
+    """0-based column index of a cell reference: A1 -> 0, AA7 -> 26. Raises ValueError past XFD."""
+    match = _CELL_COLUMN.match(reference)
+    # Three letters already reach XFD; don't evaluate longer runs at all
+    if not match or len(match.group(1)) > 3:
+        raise ValueError(f'Invalid cell reference: {reference[:20]}')
+    index = 0
+    for letter in match.group(1):
+        index = index * 26 + ord(letter) - 64
+    if index > MAX_COLUMNS:
+        raise ValueError(f'Invalid cell reference: {reference[:20]}')
+    return index - 1
+
+
+def sheet_name(name):
+    """A valid worksheet name: no []:*?/\\ and at most 31 characters"""
+    return _SHEET_NAME_ILLEGAL.sub('_', name)[:31] or 'Sheet'
+
+
+def _cell(reference, value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return f'<c r="{reference}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        if not math.isfinite(value):
+            return ''
+        return f'<c r="{reference}"><v>{value!r}</v></c>'
+    text = escape(_ILLEGAL_XML.sub('', str(value)))
+    return f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row(number, values):
+    cells = ''.join(_cell(f'{column_letter(index)}{number}', value) for index, value in enumerate(values))
+    return f'<row r="{number}">{cells}</row>'
+
+
+def stream_workbook(sheets):
+    """
+    Yield the bytes of an .xlsx file for `sheets`, a list of (name, rows).
+
+    `rows` is any iterable of row value sequences (the first one usually
+    being the header); it is only consumed while its sheet is written.
+    """
+    sheets = list(sheets)
+    names = [escape(sheet_name(name), {'"': '&quot;'}) for name, _ in sheets]
+    numbers = range(1, len(sheets) + 1)
+
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES.format(
+            sheets=''.join(_SHEET_CONTENT_TYPE.format(number=number) for number in numbers)
+        ))
+        archive.writestr('_rels/.rels', _ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _WORKBOOK.format(sheets=''.join(
+            _WORKBOOK_SHEET.format(name=name, number=number) for name, number in zip(names, numbers)
+        )))
+        archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS.format(
+            sheets=''.join(_WORKBOOK_REL.format(number=number) for number in numbers)
+        ))
+        yield sink.take()
+
+        for number, (_, rows) in zip(numbers, sheets):
+            # force_zip64: the entry size is not known up front
+            with archive.open(f'xl/worksheets/sheet{number}.xml', 'w', force_zip64=True) as sheet:
+                sheet.write(_SHEET_START.encode())
+                for row_number, values in enumerate(rows, start=1):
+                    sheet.write(_row(row_number, values).encode())
+                    if row_number % FLUSH_ROWS == 0:
+                        chunk = sink.take()
+                        if chunk:
+                            yield chunk
+                sheet.write(_SHEET_END.encode())
+            yield sink.take()
+    yield sink.take()
+
+
+def _worksheet_paths(archive):
+    """{sheet name: archive path} in workbook order"""
+    targets = {}
+    with archive.open('xl/_rels/workbook.xml.rels') as stream:
+        for relationship in ElementTree.parse(stream).getroot().iter(_PACKAGE_REL_NS + 'Relationship'):
+            target = relationship.get('Target')
+            targets[relationship.get('Id')] = target.lstrip('/') if target.startswith('/') else 'xl/' + target
+
+    with archive.open('xl/workbook.xml') as stream:
+        return {
+            sheet.get('name'): targets[sheet.get(_DOCUMENT_REL_NS + 'id')]
+            for sheet in ElementTree.parse(stream).getroot().iter(_MAIN_NS + 'sheet')
+        }
+
+
+def _shared_strings(archive):
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+    # The zip reader stops at the declared size, so this bounds what is parsed
+    if archive.getinfo('xl/sharedStrings.xml').file_size > MAX_SHARED_STRINGS_BYTES:
+        raise ValueError('The workbook\'s shared string table is too large')
+    strings = []
+    with archive.open('xl/sharedStrings.xml') as stream:
+        for _, element in ElementTree.iterparse(stream):
+            if element.tag == _MAIN_NS + 'si':
+                if len(strings) >= MAX_SHARED_STRINGS:
+                    raise ValueError('The workbook\'s shared string table is too large')
+                strings.append(''.join(text.text or '' for text in element.iter(_MAIN_NS + 't')))
+                element.clear()
+    return strings
+
+
+def _cell_value(cell, strings):
+    cell_type = cell.get('t', 'n')
+    if cell_type == 'inlineStr':
+        return ''.join(text.text or '' for text in cell.iter(_MAIN_NS + 't'))
+    value = cell.findtext(_MAIN_NS + 'v')
+    if value is None or cell_type == 'e':
+        return None
+    if cell_type == 's':
+        return strings[int(value)]
+    if cell_type == 'b':
+        return value == '1'
+    if cell_type in ('str', 'd'):
+        return value
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+def iter_sheet_rows(file, sheet=None, max_columns=MAX_COLUMNS):
+    """
+    Yield (row number, values) for one worksheet of an .xlsx file.
+
+    `file` must be seekable (zip archives keep their index at the end).
+    `sheet` picks a worksheet by name, case-insensitively; otherwise the
+    first one is read. Missing cells come back as None. Raises ValueError
+    if the file is not a workbook or a row has a cell past `max_columns`.
+    """
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile:
+        raise ValueError('File is not a valid .xlsx workbook')
+
+    with archive:
+        try:
+            paths = _worksheet_paths(archive)
+        except (KeyError, ElementTree.ParseError):
+            raise ValueError('File is not a valid .xlsx workbook')
+        if not paths:
+            return
+        by_name = {name.casefold(): path for name, path in paths.items()}
+        path = by_name.get(sheet.casefold()) if sheet else None
+        path = path or next(iter(paths.values()))
+        strings = _shared_strings(archive)
+
+        with archive.open(path) as stream:
+            sheet_data = None
+            row_number = 0
+            for event, element in ElementTree.iterparse(stream, events=('start', 'end')):
+                if event == 'start':
+                    if element.tag == _MAIN_NS + 'sheetData':
+                        sheet_data = element
+                    continue
+                if element.tag != _MAIN_NS + 'row':
+                    continue
+
+                row_number = int(element.get('r') or row_number + 1)
+                values = []
+                for cell in element.iter(_MAIN_NS + 'c'):
+                    reference = cell.get('r')
+                    index = column_index(reference) if reference else len(values)
+                    if index >= max_columns:
+                        raise ValueError(f'Row {row_number} has cells past column {column_letter(max_columns - 1)}')
+                    values.extend([None] * (index - len(values)))
+                    values.append(_cell_value(cell, strings))
+                yield row_number, values
+
+                # Drop the rows already handed out so memory stays flat
+                if sheet_data is not None:
+                    sheet_data.clear()
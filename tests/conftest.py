@@ -0,0 +1,133 @@
+"""
+Shared fixtures: one app on an in-memory SQLite database, migrated at startup,
+and a local HTTP stub standing in for an OAuth provider.
+
+src.main builds its app at import time from the environment, so the
+settings below have to be in place before it is first imported.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.update(
+    DATABASE_URL='sqlite://',
+    READ_ROUTING='0',
+    RATE_LIMIT_BACKEND='off',
+    CALCULATION_CACHE_BACKEND='off',
+    PASSWORD_HASH_PROFILE='fast',
+)
+
+
+@pytest.fixture(scope='session')
+def app():
+    from src.main import app
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_statements(app):
+    """Context manager collecting the SQL statements run on the app's engine"""
+    from src.models.user import db
+
+    @contextmanager
+    def counting():
+        statements = []
+
+        def record(connection, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
+    return counting
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Answers each path from a script of (status, body, delay) replies.
+
+    Replies are used in order and the last one repeats; every request is
+    counted in `hits` per path.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _StubHandler)
+        self.scripts = {}
+        self.headers = {}
+        self.hits = {}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}'
+
+    def script(self, path, *replies, headers=None):
+        self.scripts[path] = list(replies)
+        self.headers[path] = headers or {}
+
+    def next_reply(self, path):
+        with self._lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+            replies = self.scripts.get(path) or [(404, {}, 0)]
+            return replies.pop(0) if len(replies) > 1 else replies[0]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        path = self.path.split('?', 1)[0]
+        status, body, delay = self.server.next_reply(path)
+        time.sleep(delay)
+        payload = json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in self.server.headers.get(path, {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting
+            pass
+
+    do_GET = do_POST = _respond
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,50 @@
+"""
+The dashboard loads a profile and its collections in a fixed number of
+queries, however many goals, expenses and loans it has.
+"""
+
+import pytest
+
+from src.models.user import User, db
+from src.models.financial import FinancialExpense, FinancialGoal, FinancialLoan, FinancialProfile
+
+
+def make_profile(app, children):
+    """A user with one profile holding `children` goals, expenses and loans; returns the user id"""
+    with app.app_context():
+        user = User(username=f'dashboard{children}', email=f'dashboard{children}@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        profile = FinancialProfile(user_id=user.id, age=35, current_annual_gross_income=90000, work_tenure_years=10)
+        db.session.add(profile)
+        db.session.flush()
+        for index in range(children):
+            common = dict(user_id=user.id, profile_id=profile.id, amount=1000 + index, order_index=index)
+            db.session.add_all([
+                FinancialGoal(description=f'Goal {index}', **common),
+                FinancialExpense(description=f'Expense {index}', **common),
+                FinancialLoan(name=f'Loan {index}', **common),
+            ])
+        db.session.commit()
+        return user.id
+
+
+@pytest.fixture(scope='module')
+def dashboards(app):
+    return {children: make_profile(app, children) for children in (1, 10, 40)}
+
+
+def test_dashboard_statement_count_is_independent_of_children(client, count_statements, dashboards):
+    counts = {}
+    for children, user_id in dashboards.items():
+        with count_statements() as statements:
+            response = client.get(f'/api/financial/dashboard/{user_id}')
+        assert response.status_code == 200
+        body = response.get_json()
+        assert set(body) == {'profile', 'calculations', 'projections', 'scenarios'}
+        assert 'total_human_capital' in body['calculations']
+        assert isinstance(body['projections'], list)
+        assert len(body['profile']['goals']) == children
+        counts[children] = len(statements)
+
+    assert len(set(counts.values())) == 1, counts
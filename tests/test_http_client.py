@@ -0,0 +1,108 @@
+"""
+Retries and the circuit breaker of the OAuth provider client, against a local stub.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from src.services.http_client import ProviderClient, ProviderUnavailable
+
+
+def make_client(**options):
+    options = dict(dict(connect_timeout=1, read_timeout=0.2, retries=2, backoff=0, failure_threshold=100), **options)
+    return ProviderClient(**options)
+
+
+@pytest.mark.parametrize('send', [
+    lambda client, url: client.post('stub', url, data={'code': 'abc'}),
+    lambda client, url: client.get('stub', url, idempotent=False),
+], ids=['post', 'get-not-idempotent'])
+def test_non_idempotent_call_is_not_replayed_after_read_timeout(stub_server, send):
+    stub_server.script('/token', (200, {}, 1.0))
+    client = make_client()
+
+    with pytest.raises(requests.ReadTimeout):
+        send(client, f'{stub_server.url}/token')
+
+    assert stub_server.hits['/token'] == 1
+    assert client.stats()['stub']['retries'] == 0
+
+
+def test_non_idempotent_call_is_not_retried_on_5xx(stub_server):
+    stub_server.script('/token', (503, {}, 0), (200, {}, 0))
+    response = make_client().post('stub', f'{stub_server.url}/token')
+
+    assert response.status_code == 503
+    assert stub_server.hits['/token'] == 1
+
+
+@pytest.mark.parametrize('status', [502, 503, 504])
+def test_get_is_retried_on_gateway_errors(stub_server, status):
+    stub_server.script('/userinfo', (status, {}, 0), (status, {}, 0), (200, {'id': '42'}, 0))
+    client = make_client()
+
+    response = client.get('stub', f'{stub_server.url}/userinfo')
+
+    assert response.status_code == 200
+    assert response.json() == {'id': '42'}
+    assert stub_server.hits['/userinfo'] == 3
+    assert client.stats()['stub']['retries'] == 2
+
+
+def test_get_is_retried_after_read_timeout(stub_server):
+    stub_server.script('/userinfo', (200, {}, 1.0), (200, {'id': '42'}, 0))
+    response = make_client().get('stub', f'{stub_server.url}/userinfo')
+
+    assert response.status_code == 200
+    assert stub_server.hits['/userinfo'] == 2
+
+
+def test_breaker_opens_allows_one_trial_and_fails_fast(stub_server):
+    stub_server.script('/userinfo', (503, {}, 0))
+    client = make_client(retries=0, read_timeout=2, failure_threshold=2, reset_timeout=0.3)
+    url = f'{stub_server.url}/userinfo'
+
+    # Failures up to the threshold still reach the provider
+    assert client.get('stub', url).status_code == 503
+    assert client.get('stub', url).status_code == 503
+    assert client.stats()['stub']['breaker'] == 'open'
+
+    # Open: fail fast without a request
+    with pytest.raises(ProviderUnavailable) as error:
+        client.get('stub', url)
+    assert 0 < error.value.retry_after <= 0.3
+    assert stub_server.hits['/userinfo'] == 2
+
+    # Half-open: one slow trial goes through, concurrent callers still fail fast
+    time.sleep(0.35)
+    assert client.stats()['stub']['breaker'] == 'half-open'
+    stub_server.script('/userinfo', (200, {'id': '42'}, 0.3))
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        trial = pool.submit(client.get, 'stub', url)
+        time.sleep(0.1)
+        with pytest.raises(ProviderUnavailable):
+            client.get('stub', url)
+        assert trial.result().status_code == 200
+    assert stub_server.hits['/userinfo'] == 3
+
+    # A successful trial closes the breaker again
+    assert client.stats()['stub']['breaker'] == 'closed'
+    assert client.get('stub', url).status_code == 200
+    assert client.stats()['stub']['rejected'] == 2
+
+
+def test_failed_trial_reopens_the_breaker(stub_server):
+    stub_server.script('/userinfo', (503, {}, 0))
+    client = make_client(retries=0, failure_threshold=1, reset_timeout=0.2)
+    url = f'{stub_server.url}/userinfo'
+
+    client.get('stub', url)
+    time.sleep(0.25)
+    assert client.get('stub', url).status_code == 503
+
+    with pytest.raises(ProviderUnavailable):
+        client.get('stub', url)
+    assert stub_server.hits['/userinfo'] == 2
@@ -0,0 +1,118 @@
+"""
+Local ID token verification, with tokens signed by keys generated here and
+the JWKS served by the stub provider.
+"""
+
+import time
+
+import pytest
+from authlib.jose import JsonWebKey, JsonWebToken
+
+from src.services import id_tokens
+from src.services.http_client import ProviderClient
+from src.services.id_tokens import IdTokenError, JwksCache, verify_id_token
+
+ISSUER = 'https://accounts.google.com'
+AUDIENCE = 'test-client-id'
+
+
+@pytest.fixture(scope='module')
+def signing_key():
+    return JsonWebKey.generate_key('RSA', 2048, is_private=True, options={'kid': 'key-1'})
+
+
+@pytest.fixture(scope='module')
+def other_key():
+    return JsonWebKey.generate_key('RSA', 2048, is_private=True, options={'kid': 'key-2'})
+
+
+def sign(key, algorithm='RS256', **overrides):
+    now = int(time.time())
+    claims = {'iss': ISSUER, 'aud': AUDIENCE, 'sub': '42', 'iat': now, 'exp': now + 3600,
+              'email': 'someone@example.com', 'email_verified': True}
+    claims.update(overrides)
+    # None drops a claim
+    claims = {name: value for name, value in claims.items() if value is not None}
+    header = {'alg': algorithm, 'kid': getattr(key, 'kid', None)}
+    return JsonWebToken([algorithm]).encode(header, claims, key).decode()
+
+
+@pytest.fixture
+def jwks(stub_server, signing_key):
+    stub_server.script('/certs', (200, {'keys': [signing_key.as_dict(is_private=False)]}, 0))
+    return JwksCache('stub', f'{stub_server.url}/certs', client=ProviderClient(retries=0))
+
+
+def verify(token, jwks):
+    return verify_id_token(token, jwks, AUDIENCE, (ISSUER,))
+
+
+def test_valid_token_returns_its_claims(jwks, signing_key):
+    claims = verify(sign(signing_key), jwks)
+
+    assert claims['sub'] == '42'
+    assert claims['email'] == 'someone@example.com'
+
+
+@pytest.mark.parametrize('overrides', [
+    {'aud': 'someone-else'},
+    {'iss': 'https://evil.example.com'},
+    {'exp': int(time.time()) - 3600, 'iat': int(time.time()) - 7200},
+], ids=['wrong-aud', 'wrong-iss', 'expired'])
+def test_rejects_bad_claims(jwks, signing_key, overrides):
+    with pytest.raises(IdTokenError):
+        verify(sign(signing_key, **overrides), jwks)
+
+
+def test_rejects_other_algorithms(jwks, stub_server):
+    # HS256 with the public key as the shared secret is the classic confusion attack
+    token = sign(b'not-an-rsa-key' * 4, algorithm='HS256')
+
+    with pytest.raises(IdTokenError, match='algorithm'):
+        verify(token, jwks)
+    # Rejected before any key is fetched
+    assert stub_server.hits.get('/certs') is None
+
+
+def test_rejects_a_forged_signature(jwks, signing_key, other_key):
+    forged = sign(other_key)
+    # Claim the trusted key id while signing with another key
+    header, _, _ = sign(signing_key).split('.')
+    token = '.'.join([header] + forged.split('.')[1:])
+
+    with pytest.raises(IdTokenError):
+        verify(token, jwks)
+
+
+def test_unknown_kid_refreshes_at_most_once_per_interval(jwks, signing_key, other_key, stub_server, monkeypatch):
+    monkeypatch.setattr(id_tokens, 'JWKS_MIN_REFRESH_SECONDS', 0.3)
+    verify(sign(signing_key), jwks)
+    assert jwks.refreshes == 1
+
+    time.sleep(0.35)
+    for _ in range(5):
+        with pytest.raises(IdTokenError):
+            verify(sign(other_key), jwks)
+    assert jwks.refreshes == 2
+    assert stub_server.hits['/certs'] == 2
+
+    # The provider rotates in the new key; it is picked up by the next allowed refresh
+    stub_server.script('/certs', (200, {'keys': [key.as_dict(is_private=False) for key in (signing_key, other_key)]}, 0))
+    with pytest.raises(IdTokenError):
+        verify(sign(other_key), jwks)
+    assert jwks.refreshes == 2
+    time.sleep(0.35)
+    assert verify(sign(other_key), jwks)['sub'] == '42'
+    assert jwks.refreshes == 3
+
+
+def test_google_requires_a_verified_email(app, jwks, signing_key, monkeypatch):
+    from src.routes import oauth
+    monkeypatch.setattr(oauth, 'google_jwks', jwks)
+    monkeypatch.setattr(oauth, 'GOOGLE_CLIENT_ID', AUDIENCE)
+
+    assert oauth.google_id_token_user(sign(signing_key))['email'] == 'someone@example.com'
+    # Absent or anything but true is not good enough to link an account by email
+    for email_verified in (False, None, 'true'):
+        with pytest.raises(IdTokenError, match='not verified'):
+            oauth.google_id_token_user(sign(signing_key, email_verified=email_verified))
@@ -0,0 +1,22 @@
+"""
+Every hot query keeps using an index on a freshly migrated SQLite database.
+"""
+
+from sqlalchemy import create_engine
+
+from src.services.migrations import upgrade
+from src.services.query_plans import check_query_plans
+
+
+def test_hot_queries_use_indexes(app, tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "plans.db"}')
+    try:
+        upgrade(engine, log=lambda message: None)
+        with engine.connect() as connection:
+            results = check_query_plans(connection)
+    finally:
+        engine.dispose()
+
+    assert results
+    failures = {label: problems for label, _, problems in results if problems}
+    assert not failures, failures